@@ -0,0 +1,86 @@
+import sys
+import glob
+import numpy as np
+import pandas as pd
+from time import perf_counter
+from src.utils.logger import logger
+from src.transformation.cleaning import clean_prices_and_ratings
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+RAW_DIR = "data/raw"
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+# Caminho por linha usado pelo DatabaseLoader antes do módulo de limpeza
+def extract_price(price_text):
+    import re
+    price_clean = re.sub(r'[^\d.,]', '', str(price_text))
+    try:
+        return float(price_clean.replace(',', '.'))
+    except:
+        return 0.0
+
+def extract_rating(rating_text):
+    import re
+    numbers = re.findall(r'\d+\.?\d*', str(rating_text))
+    try:
+        return float(numbers[0]) if numbers else 0.0
+    except:
+        return 0.0
+
+def per_row(df):
+    prices, ratings = [], []
+    for _, row in df.iterrows():
+        prices.append(extract_price(row["final_price"]))
+        ratings.append(extract_rating(row["review_score"]))
+
+    return prices, ratings
+
+def build_sample(rows, raw_dir=RAW_DIR):
+    df = pd.concat([pd.read_csv(path) for path in glob.glob(f"{raw_dir}/*.csv")], ignore_index=True)
+    df = df[["final_price", "review_score"]].sample(rows, replace=True, random_state=42).reset_index(drop=True)
+
+    # Valores novos em cada linha, no formato de cada moeda, para que o
+    # conjunto não se reduza aos poucos preços distintos dos exemplos
+    amounts = pd.Series(np.random.default_rng(42).integers(50, 50_000, rows))
+    en      = df["final_price"].str.startswith("$")
+    df["final_price"] = np.where(
+        en,
+        "$" + amounts.map("{:,}".format),
+        df["final_price"].str.extract(r"^(\D+)", expand=False) + amounts.map("{:,}".format).str.replace(",", ".")
+    )
+
+    return df
+
+def benchmark(rows=1_000_000, per_row_rows=50_000):
+    df = build_sample(rows)
+    logger.info("Amostra com {} linhas ({} preços distintos).".format(len(df), df["final_price"].nunique()))
+
+    start = perf_counter()
+    clean_prices_and_ratings(df)
+    vectorized = perf_counter() - start
+    logger.info("Vetorizado: {} linhas em {:.2f}s ({:,.0f} linhas/s).".format(rows, vectorized, rows / vectorized))
+
+    # O caminho por linha é lento demais para 1M: mede uma fração e projeta
+    start = perf_counter()
+    per_row(df.head(per_row_rows))
+    elapsed   = perf_counter() - start
+    projected = elapsed * rows / per_row_rows
+    logger.info("Por linha: {} linhas em {:.2f}s, ~{:.1f}s projetados para {} linhas.".format(per_row_rows, elapsed, projected, rows))
+
+    logger.info("Ganho: {:.0f}x.".format(projected / vectorized))
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+if __name__ == "__main__":
+    logger.name = "bench_cleaning.py"
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    benchmark(rows)
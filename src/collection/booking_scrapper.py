@@ -1,10 +1,12 @@
 
-from time import sleep
 from datetime import datetime
+from urllib.parse import (urlencode, urlsplit, urlunsplit, parse_qsl)
 from src.utils.logger import logger
+from src.utils.tracing import traced
 from src.utils.selenium import Selenium
+from src.collection.page_selectors import (BOOKING_PROPERTY_CARD, BOOKING_PROPERTY_FIELDS)
 from selenium.webdriver.common.by import By
-from random import (randint, uniform, random)
+from random import random
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common import StaleElementReferenceException, TimeoutException
 
@@ -12,8 +14,21 @@ from selenium.common import StaleElementReferenceException, TimeoutException
 # Init ---------------------------------------------------------------------- #
 
 
+ONETRUST_CONSENT_COOKIE = "OptanonAlertBoxClosed"
+
+# Página pronta (busca na home ou cards nos resultados): se um destes aparece
+# antes do banner de cookies, o perfil não vai mostrar o banner
+PAGE_READY_SELECTORS = ["div[data-testid='searchbox-layout-wide']", BOOKING_PROPERTY_CARD]
+
+# Parâmetros de data (e paginação) da URL de resultados, trocados por change_dates
+DATE_URL_PARAMS = {
+    "checkin", "checkout", "checkin_year", "checkin_month", "checkin_monthday",
+    "checkout_year", "checkout_month", "checkout_monthday", "offset"
+}
+
+
 class BookingScrapper:
-    def __init__(self, selenium_utils: Selenium):
+    def __init__(self, selenium_utils: Selenium, open_home=True):
         logger.name = "{}".format(self.get_name())
 
         logger.info("Inicializando {}...".format(self.get_name()))
@@ -21,55 +36,103 @@ class BookingScrapper:
         self.base_url       = "https://booking.com/"
         self.selenium_utils = selenium_utils
 
-        self.selenium_utils.get(self.base_url)
+        if open_home: self.open_home()
 
         logger.info("{} iniciado.".format(self.get_name()))
 
+    def wait_cookie_button(self, button_selector):
+        # Corrida entre o botão do banner e a página pronta: em um perfil sem
+        # banner a espera termina assim que a página carrega, sem o timeout
+        index, element = self.selenium_utils.wait_for_any([button_selector] + PAGE_READY_SELECTORS)
+
+        return element if index == 0 else None
+
+    @traced()
     def decline_cookie(self):
+        if self.selenium_utils.get_state("booking.cookies") is not None:
+            logger.info("Cookies do site já configurados no perfil do navegador.")
+            return
+
         logger.info("Rejeitando cookies do site...")
 
+        # O OneTrust grava este cookie quando o usuário já respondeu ao banner;
+        # com ele presente o banner não aparece e não vale esperar por ele
+        if self.selenium_utils.driver.get_cookie(ONETRUST_CONSENT_COOKIE) is not None:
+            logger.info("Cookies do site já configurados.")
+            return
+
         try:
-            locator = (By.CSS_SELECTOR, "button[id='onetrust-reject-all-handler']")
-            element = self.selenium_utils.wait.until(EC.visibility_of_element_located(locator))
-            sleep(uniform(0.5, 2))
-            self.selenium_utils.click(element)
+            element = self.wait_cookie_button("button[id='onetrust-reject-all-handler']")
         except TimeoutException:
             logger.warning("Popup de configurações de cookies não encontrado.")
-        else:
-            logger.info("Cookies do site rejeitados.")
+            return
+
+        if element is None:
+            logger.info("Página carregada sem popup de cookies.")
+            return
+
+        self.selenium_utils.pause(0.5, 2)
+        self.selenium_utils.click(element)
+        self.selenium_utils.set_state("booking.cookies", "declined")
+        logger.info("Cookies do site rejeitados.")
 
+    @traced()
     def accept_cookie(self):
+        if self.selenium_utils.get_state("booking.cookies") is not None:
+            logger.info("Cookies do site já configurados no perfil do navegador.")
+            return
+
         logger.info("Aceitando cookies do site...")
 
+        if self.selenium_utils.driver.get_cookie(ONETRUST_CONSENT_COOKIE) is not None:
+            logger.info("Cookies do site já configurados.")
+            return
+
         try:
-            locator = (By.CSS_SELECTOR, "button[id='onetrust-accept-btn-handler']")
-            element = self.selenium_utils.wait.until(EC.visibility_of_element_located(locator))
-            sleep(uniform(0.5, 2))
-            self.selenium_utils.click(element)
+            element = self.wait_cookie_button("button[id='onetrust-accept-btn-handler']")
         except TimeoutException:
             logger.warning("Popup de configurações de cookies não encontrado.")
-        else:
-            logger.info("Cookies do site aceitos.")
+            return
+
+        if element is None:
+            logger.info("Página carregada sem popup de cookies.")
+            return
 
+        self.selenium_utils.pause(0.5, 2)
+        self.selenium_utils.click(element)
+        self.selenium_utils.set_state("booking.cookies", "accepted")
+        logger.info("Cookies do site aceitos.")
+
+    @traced()
     def select_idiom(self, idiom="pt-br"):
+        if self.selenium_utils.get_state("booking.idiom") == idiom:
+            logger.info('Idioma "{}" já selecionado no perfil do navegador.'.format(idiom))
+            return
+
         logger.info('Selecionando o idioma "{}"...'.format(idiom))
 
         element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[data-testid='header-language-picker-trigger']")))
-        sleep(uniform(0.5, 2))
+        self.selenium_utils.pause(0.5, 2)
         self.selenium_utils.click(element)
 
         element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[data-testid='selection-item'][lang='{}']".format(idiom))))
-        sleep(uniform(0.5, 2))
+        self.selenium_utils.pause(0.5, 2)
         self.selenium_utils.click(element)
 
+        self.selenium_utils.set_state("booking.idiom", idiom)
         logger.info("Idioma selecionado.")
 
+    @traced()
     def select_coin(self, coin="brl"):
+        if self.selenium_utils.get_state("booking.coin") == coin.lower():
+            logger.info('Moeda "{}" já selecionada no perfil do navegador.'.format(coin))
+            return
+
         logger.info('Selecionando a moeda "{}"...'.format(coin))
 
         try:
             element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[data-testid='header-currency-picker-trigger']")))
-            sleep(uniform(0.5, 2))
+            self.selenium_utils.pause(0.5, 2)
             self.selenium_utils.click(element)
 
             element = None
@@ -84,27 +147,31 @@ class BookingScrapper:
 
             assert element is not None, 'A moeda "{}" não foi encontrada'.format(coin.upper())
 
-            sleep(uniform(0.5, 2))
+            self.selenium_utils.pause(0.5, 2)
             self.selenium_utils.click(element)
 
-            sleep(random())
+            self.selenium_utils.pause(0, 1)
             self.selenium_utils.click(element)
+
+            self.selenium_utils.set_state("booking.coin", coin)
         except StaleElementReferenceException as error:
             logger.warning("Ocorreu um erro: {}".format(error.msg))
 
         logger.info("Moeda selecionada.")
 
+    @traced()
     def set_destination(self, destination):
         logger.info('Configurando destino para "{}"...'.format(destination))
 
         element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "div[data-testid='searchbox-layout-wide'] div[data-testid='destination-container']")))
-        sleep(uniform(0.5, 2))
+        self.selenium_utils.pause(0.5, 2)
         self.selenium_utils.click(element)
 
         self.selenium_utils.type(destination)
 
         logger.info("Destino configurado.")
 
+    @traced()
     def set_dates(self, day, month, year, days_in="exact"):
         logger.info(
             'Configurando data de check-in para: "dia={0}", "mês={1}", "ano={2}", "quantidade_de_dias={3}"...'.format(
@@ -113,104 +180,131 @@ class BookingScrapper:
         )
 
         element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "div[data-testid='searchbox-layout-wide'] button[data-testid='searchbox-dates-container'")))
-        sleep(uniform(0.5, 2))
+        self.selenium_utils.pause(0.5, 2)
         self.selenium_utils.click(element)
 
         now_month = int(datetime.now().month)
         assert (int(month) == now_month) or (int(month) == (now_month + 1)), "O mês deve ser o atual, ou o próximo, considerando a data da máquina local"
         element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "div[data-testid='searchbox-datepicker'] span[data-date='{0}-{1}-{2}']".format(year, month, day))))
-        sleep(uniform(0.5, 2))
+        self.selenium_utils.pause(0.5, 2)
         #assert int(element.text) == int(day)
         self.selenium_utils.click(element)
 
-        days_in = days_in.lower()
+        days_in = str(days_in).lower()
         assert (days_in == "exact") or (days_in in ["1", "2", "3", "7"]), 'A quantidade de dias somente pode ser: "1", "2", "3", "7" ou "exact"'
         element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, f"div[data-testid='datepicker-footer'] input[value='{days_in}']")))
         element = element.find_element(By.XPATH, "./..")
-        sleep(uniform(0.5, 2))
+        self.selenium_utils.pause(0.5, 2)
         self.selenium_utils.click(element)
 
         logger.info("Data de check-in configurada.")
 
+    @traced()
     def set_occupancy(self):
         logger.info("Configurando ocupantes...")
 
         element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "div[data-testid='searchbox-layout-wide'] button[data-testid='occupancy-config']")))
-        sleep(uniform(0.5, 2))
+        self.selenium_utils.pause(0.5, 2)
         self.selenium_utils.click(element)
 
         self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "div[data-testid='occupancy-popup'] button")))
         element = self.selenium_utils.driver.find_elements(By.CSS_SELECTOR, "div[data-testid='occupancy-popup'] button")[-1]
         #assert element.text.lower().replace(" ", "") == "ok"
-        sleep(uniform(0.5, 2))
+        self.selenium_utils.pause(0.5, 2)
         self.selenium_utils.click(element)
 
         logger.info("Ocupantes configurados.")
 
+    @traced()
     def search(self):
         logger.info("Pesquisando...")
 
         element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "div[data-testid='searchbox-layout-wide'] button[type='submit']")))
-        sleep(uniform(0.5, 2))
+        self.selenium_utils.pause(0.5, 2)
         self.selenium_utils.click(element)
 
         logger.info("Pesquisa realizada.")
 
+    @traced()
     def set_hotel_filter(self):
         logger.info("Filtrando tipo de propriedade para hotel...")
 
-        element = None
-        try:
-            element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "div[data-filters-item='ht_id:ht_id=204']")))
-        except TimeoutException:
-            element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "div[data-filters-item='popular:ht_id=204']")))
-        finally:
-            sleep(uniform(0.5, 2))
-            self.selenium_utils.click(element)
+        # Os dois seletores são observados ao mesmo tempo: vale o que aparecer primeiro
+        _, element = self.selenium_utils.wait_for_any([
+            "div[data-filters-item='ht_id:ht_id=204']",
+            "div[data-filters-item='popular:ht_id=204']"
+        ])
+        self.selenium_utils.pause(0.5, 2)
+        self.selenium_utils.click(element)
 
         logger.info("Tipo de propriedade filtrado para hotel.")
 
-    def get_property_elements(self):
+    @traced()
+    def get_property_elements(self, max_steps=200):
         logger.info("Obtendo elementos das propriedades...")
 
-        while True:
-            last_height = self.selenium_utils.driver.execute_script("return document.body.scrollHeight")
-
+        for _ in range(max_steps):
             if random() <= 0.20:
                 self.selenium_utils.scroll_up()
-                sleep(uniform(0.5, 2))
+                self.selenium_utils.pause(0.5, 2)
 
             self.selenium_utils.scroll_down()
 
-            if random() <= 0.20: sleep(randint(1, 3))
+            if random() <= 0.20: self.selenium_utils.pause(1, 3)
 
             new_height = self.selenium_utils.driver.execute_script("return window.pageYOffset + window.innerHeight")
             total_height = self.selenium_utils.driver.execute_script("return document.body.scrollHeight")
 
-            if new_height >= (total_height * 0.98):
-                elements = self.selenium_utils.wait.until(EC.visibility_of_all_elements_located((By.CSS_SELECTOR, "div[data-testid='property-card-container']")))
-                assert len(elements) > 0, "Nenhuma propriedade fora encontrada"
-                logger.info("Elementos das propriedades obtidos.")
-                return elements
-
-    def get_property_information(self, elements: list):
+            if new_height >= (total_height * 0.98): break
+        else:
+            logger.warning("Limite de {} rolagens atingido antes do fim da página.".format(max_steps))
+
+        elements = self.selenium_utils.wait.until(EC.visibility_of_all_elements_located((By.CSS_SELECTOR, BOOKING_PROPERTY_CARD)))
+        assert len(elements) > 0, "Nenhuma propriedade fora encontrada"
+        logger.info("Elementos das propriedades obtidos.")
+        return elements
+
+    @traced()
+    def iter_property_information(self, max_records=None, max_seconds=None, max_stale_steps=3, max_steps=200):
+        logger.info("Obtendo informações das propriedades durante a rolagem...")
+
+        self.selenium_utils.wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, BOOKING_PROPERTY_CARD)))
+
+        total = 0
+        for record in self.selenium_utils.iter_records_while_scrolling(
+                BOOKING_PROPERTY_CARD,
+                BOOKING_PROPERTY_FIELDS,
+                max_records=max_records,
+                max_seconds=max_seconds,
+                max_stale_steps=max_stale_steps,
+                max_steps=max_steps
+        ):
+            total += 1
+            yield record
+
+        assert total > 0, "Nenhuma propriedade fora encontrada"
+        logger.info("Informações de {} propriedades obtidas.".format(total))
+
+    @traced()
+    def get_property_information(self, elements: list, bulk=False):
         logger.info("Obtendo informações das propriedades...")
 
+        if bulk:
+            # Uma única chamada execute_script lê todos os campos de todos os cards
+            properties_information = self.selenium_utils.extract_records(
+                elements if elements is not None else BOOKING_PROPERTY_CARD, BOOKING_PROPERTY_FIELDS
+            )
+
+            logger.info("Informações das propriedades obtidas.")
+
+            return properties_information
+
         properties_information = []
         for element in elements:
             try:
-                title             = element.find_element(By.CSS_SELECTOR, "div[data-testid='title']").text
-                address           = element.find_element(By.CSS_SELECTOR, "span[data-testid='address']").text
-                recommended_units = element.find_element(By.CSS_SELECTOR, "div[data-testid='recommended-units']").text
-                review_score      = element.find_element(By.CSS_SELECTOR, "div[data-testid='review-score']").text
-                final_price       = element.find_element(By.CSS_SELECTOR, "span[data-testid='price-and-discounted-price']").text
-
                 properties_information.append({
-                    "title"            : title,
-                    "address"          : address,
-                    "recommended_units": recommended_units,
-                    "review_score"     : review_score,
-                    "final_price"      : final_price
+                    name: element.find_element(By.CSS_SELECTOR, selector).text if selector else None
+                    for name, selector in BOOKING_PROPERTY_FIELDS.items()
                 })
             except:
                 logger.warning(f"Erro ao obter informações do elemento: '''{element.text}'''")
@@ -219,5 +313,57 @@ class BookingScrapper:
 
         return properties_information
 
+    def build_search_url(self, destination, checkin, checkout, idiom="pt-br", coin="brl", days_in="exact"):
+        params = {
+            "ss"               : destination,
+            "checkin"          : checkin.isoformat(),
+            "checkout"         : checkout.isoformat(),
+            "group_adults"     : 2,
+            "no_rooms"         : 1,
+            "group_children"   : 0,
+            "lang"             : idiom,
+            "selected_currency": coin.upper(),
+            "nflt"             : "ht_id=204"
+        }
+
+        days_in = str(days_in).lower()
+        if days_in != "exact": params["flex_window"] = days_in
+
+        return "https://www.booking.com/searchresults.{}.html?{}".format(idiom, urlencode(params))
+
+    @traced()
+    def open_search_url(self, url):
+        if url is None: return False
+
+        logger.info('Abrindo pesquisa direta "{}"...'.format(url))
+
+        self.selenium_utils.get(url)
+
+        try:
+            self.selenium_utils.wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, BOOKING_PROPERTY_CARD)))
+        except TimeoutException:
+            logger.warning("Pesquisa direta não retornou propriedades.")
+            return False
+
+        logger.info("Pesquisa direta aberta.")
+
+        return True
+
+    @traced()
+    def change_dates(self, checkin, checkout):
+        # Reaproveita a pesquisa atual (destino, idioma, moeda e filtros já
+        # aplicados) trocando apenas as datas na URL de resultados
+        url = urlsplit(self.selenium_utils.driver.current_url)
+        if "searchresults" not in url.path: return False
+
+        params  = [(key, value) for key, value in parse_qsl(url.query, keep_blank_values=True) if key not in DATE_URL_PARAMS]
+        params += [("checkin", checkin.isoformat()), ("checkout", checkout.isoformat())]
+
+        return self.open_search_url(urlunsplit(url._replace(query=urlencode(params))))
+
+    @traced()
+    def open_home(self):
+        self.selenium_utils.get(self.base_url)
+
     def get_name(self):
         return self.__class__.__name__
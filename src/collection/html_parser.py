@@ -0,0 +1,141 @@
+import os
+import re
+import sys
+import glob
+import pandas as pd
+from bs4 import (BeautifulSoup, NavigableString, Comment)
+from bs4.builder import builder_registry
+from src.utils.logger import logger
+from src.collection.page_selectors import (
+    BOOKING_PROPERTY_CARD,
+    BOOKING_PROPERTY_FIELDS,
+    TRIVAGO_PROPERTY_CARD,
+    TRIVAGO_PROPERTY_FIELDS
+)
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+SITE_SELECTORS = {
+    "booking": (BOOKING_PROPERTY_CARD, BOOKING_PROPERTY_FIELDS),
+    "trivago": (TRIVAGO_PROPERTY_CARD, TRIVAGO_PROPERTY_FIELDS),
+}
+
+# lxml é bem mais rápido; o html.parser da biblioteca padrão é o fallback
+HTML_FEATURES = "lxml" if builder_registry.lookup("lxml") else "html.parser"
+
+# Elementos que quebram linha no innerText do navegador
+BLOCK_TAGS = {
+    "address", "article", "aside", "br", "dd", "div", "dl", "dt", "footer", "form", "h1", "h2", "h3", "h4",
+    "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "section", "table", "tr", "ul"
+}
+SKIP_TAGS = {"script", "style", "noscript", "template"}
+
+WHITESPACE_PATTERN = re.compile(r"[ \t\r\f\v\xa0]+")
+
+# Fora de data/raw: os CSVs originais da coleta ficam ao lado das páginas
+REPARSED_DIR = "data/reparsed"
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def inner_text(node):
+    # Aproxima o element.text do Selenium: texto inline concatenado, quebra de
+    # linha nos elementos de bloco e espaços colapsados.
+    parts = []
+    for descendant in node.descendants:
+        if isinstance(descendant, Comment): continue
+
+        if isinstance(descendant, NavigableString):
+            if descendant.parent is not None and descendant.parent.name in SKIP_TAGS: continue
+            parts.append(str(descendant))
+        elif descendant.name in BLOCK_TAGS:
+            parts.append("\n")
+
+    lines = (WHITESPACE_PATTERN.sub(" ", line).strip() for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+def detect_site(path):
+    name = os.path.basename(path).lower()
+    for site in SITE_SELECTORS:
+        if name.startswith(site): return site
+
+    return None
+
+def parse_page_source(html, site):
+    site = site.lower()
+    assert site in SITE_SELECTORS, 'O site "{}" não é suportado'.format(site)
+
+    card_selector, fields = SITE_SELECTORS[site]
+    soup = BeautifulSoup(html, HTML_FEATURES)
+
+    properties_information = []
+    for card in soup.select(card_selector):
+        record = {}
+        for name, selector in fields.items():
+            if selector is None:
+                record[name] = None
+                continue
+
+            node = card.select_one(selector)
+            if node is None:
+                record = None
+                break
+
+            record[name] = inner_text(node)
+
+        if record is None:
+            logger.warning(f"Erro ao obter informações do elemento: '''{inner_text(card)}'''")
+            continue
+
+        properties_information.append(record)
+
+    return properties_information
+
+def parse_saved_page(path, site=None):
+    site = site or detect_site(path)
+    assert site is not None, 'Não foi possível identificar o site de "{}"'.format(path)
+
+    with open(path, 'r', encoding="utf-8") as f:
+        return parse_page_source(f.read(), site)
+
+def reparse_saved_pages(input_dir, output_dir=REPARSED_DIR, site=None, overwrite=False):
+    assert os.path.abspath(output_dir) != os.path.abspath(input_dir), (
+        "A saída não pode ser a pasta das páginas, onde estão os CSVs originais"
+    )
+    os.makedirs(output_dir, exist_ok=True)
+
+    paths = sorted(glob.glob(os.path.join(input_dir, "*.html")))
+    logger.info("Reprocessando {} páginas salvas de {}...".format(len(paths), input_dir))
+
+    outputs = []
+    for path in paths:
+        properties_information = parse_saved_page(path, site)
+
+        output_file = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + ".csv")
+        if os.path.exists(output_file) and not overwrite:
+            logger.warning("{} já existe, ignorado.".format(output_file))
+            continue
+
+        pd.DataFrame(properties_information).to_csv(output_file, index=False)
+
+        logger.info("{} registros extraídos de {}.".format(len(properties_information), path))
+        outputs.append(output_file)
+
+    logger.info("Páginas salvas reprocessadas.")
+
+    return outputs
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+if __name__ == "__main__":
+    logger.name = "html_parser.py"
+
+    input_dir  = sys.argv[1] if len(sys.argv) > 1 else "data/raw"
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else REPARSED_DIR
+
+    reparse_saved_pages(input_dir, output_dir)
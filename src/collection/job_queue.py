@@ -0,0 +1,205 @@
+import os
+import json
+import sqlite3
+import hashlib
+from time import time
+from src.utils.logger import logger
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+JOB_QUEUE_FILE = "data/state/jobs.sqlite"
+
+# Campos que não mudam o que é coletado e por isso não entram na chave do job
+VOLATILE_JOB_FIELDS = ("output_dir", "job_key", "queue_path")
+
+
+class JobQueue:
+    def __init__(self, path=JOB_QUEUE_FILE, max_attempts=3, backoff_seconds=30):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.path            = path
+        self.max_attempts    = max_attempts
+        self.backoff_seconds = backoff_seconds
+
+        # Autocommit: as transações são abertas explicitamente com BEGIN IMMEDIATE
+        # para que o processo principal e os workers possam usar o mesmo arquivo.
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.create_tables()
+
+    def create_tables(self):
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                output TEXT,
+                seq INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_key TEXT NOT NULL REFERENCES jobs(job_key),
+                records TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        # Filas criadas antes da coluna seq: a ordem de inserção é a do rowid
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(jobs)")]
+        if "seq" not in columns:
+            self.connection.execute("ALTER TABLE jobs ADD COLUMN seq INTEGER")
+            self.connection.execute("UPDATE jobs SET seq = rowid")
+
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state, next_attempt_at)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_checkpoints_job ON checkpoints (job_key)")
+
+    @staticmethod
+    def job_key(job):
+        payload = {key: value for key, value in job.items() if key not in VOLATILE_JOB_FIELDS}
+        return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def enqueue(self, jobs):
+        now  = time()
+        keys = []
+        for job in jobs:
+            key = self.job_key(job)
+            # seq guarda a ordem de submissão: todos os jobs do lote têm o mesmo created_at
+            self.connection.execute(
+                "INSERT OR IGNORE INTO jobs (job_key, payload, seq, created_at, updated_at) "
+                "VALUES (?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM jobs), ?, ?)",
+                (key, json.dumps(job, sort_keys=True), now, now)
+            )
+            keys.append(key)
+
+        return keys
+
+    def recover(self):
+        # Jobs que ficaram "running" pertencem a uma execução que morreu
+        cursor = self.connection.execute(
+            "UPDATE jobs SET state = 'pending', updated_at = ? WHERE state = 'running'", (time(),)
+        )
+        if cursor.rowcount: logger.warning("{} jobs interrompidos voltaram para a fila.".format(cursor.rowcount))
+
+        return cursor.rowcount
+
+    def retry_failed(self, keys):
+        # Jobs que esgotaram as tentativas voltam para a fila com o contador
+        # zerado: rodar o lote de novo refaz só o que falhou
+        if not keys: return 0
+
+        cursor = self.connection.execute(
+            "UPDATE jobs SET state = 'pending', attempts = 0, next_attempt_at = 0, updated_at = ? "
+            "WHERE state = 'failed' AND job_key IN ({})".format(", ".join("?" * len(keys))),
+            [time()] + list(keys)
+        )
+        if cursor.rowcount: logger.warning("{} jobs com falha voltaram para a fila.".format(cursor.rowcount))
+
+        return cursor.rowcount
+
+    def claim(self, keys=None):
+        now = time()
+
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            query  = "SELECT job_key, payload FROM jobs WHERE state = 'pending' AND next_attempt_at <= ?"
+            params = [now]
+            if keys is not None:
+                query  += " AND job_key IN ({})".format(", ".join("?" * len(keys)))
+                params += list(keys)
+
+            row = self.connection.execute(query + " ORDER BY seq LIMIT 1", params).fetchone()
+            if row is not None:
+                self.connection.execute(
+                    "UPDATE jobs SET state = 'running', attempts = attempts + 1, updated_at = ? WHERE job_key = ?",
+                    (now, row[0])
+                )
+                # Cada tentativa recomeça a coleta: os registros parciais da
+                # anterior já não valem
+                self.connection.execute("DELETE FROM checkpoints WHERE job_key = ?", (row[0],))
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+        if row is None: return None
+
+        return row[0], json.loads(row[1])
+
+    def complete(self, key, output=None):
+        self.connection.execute(
+            "UPDATE jobs SET state = 'done', output = ?, last_error = NULL, updated_at = ? WHERE job_key = ?",
+            (output, time(), key)
+        )
+        self.clear_checkpoint(key)
+
+    def fail(self, key, error):
+        attempts = self.connection.execute("SELECT attempts FROM jobs WHERE job_key = ?", (key,)).fetchone()[0]
+
+        if attempts >= self.max_attempts:
+            self.connection.execute(
+                "UPDATE jobs SET state = 'failed', last_error = ?, updated_at = ? WHERE job_key = ?",
+                (error, time(), key)
+            )
+            logger.error("Job {} falhou definitivamente após {} tentativas: {}".format(key, attempts, error))
+            return "failed"
+
+        # Backoff exponencial: 30s, 60s, 120s...
+        delay = self.backoff_seconds * (2 ** (attempts - 1))
+        self.connection.execute(
+            "UPDATE jobs SET state = 'pending', last_error = ?, next_attempt_at = ?, updated_at = ? WHERE job_key = ?",
+            (error, time() + delay, time(), key)
+        )
+        logger.warning("Job {} falhou (tentativa {}), nova tentativa em {}s: {}".format(key, attempts, delay, error))
+        return "pending"
+
+    def next_attempt_in(self, keys=None):
+        query  = "SELECT MIN(next_attempt_at) FROM jobs WHERE state = 'pending'"
+        params = []
+        if keys is not None:
+            query  += " AND job_key IN ({})".format(", ".join("?" * len(keys)))
+            params += list(keys)
+
+        next_attempt_at = self.connection.execute(query, params).fetchone()[0]
+        if next_attempt_at is None: return None
+
+        return max(0.0, next_attempt_at - time())
+
+    def checkpoint(self, key, records):
+        if not records: return
+
+        self.connection.execute(
+            "INSERT INTO checkpoints (job_key, records, created_at) VALUES (?, ?, ?)",
+            (key, json.dumps(records, ensure_ascii=False), time())
+        )
+
+    def get_checkpoint(self, key):
+        records = []
+        for (batch,) in self.connection.execute("SELECT records FROM checkpoints WHERE job_key = ? ORDER BY id", (key,)):
+            records.extend(json.loads(batch))
+
+        return records
+
+    def clear_checkpoint(self, key):
+        self.connection.execute("DELETE FROM checkpoints WHERE job_key = ?", (key,))
+
+    def get_job(self, key):
+        row = self.connection.execute(
+            "SELECT state, attempts, last_error, output FROM jobs WHERE job_key = ?", (key,)
+        ).fetchone()
+        if row is None: return None
+
+        return {"job_key": key, "state": row[0], "attempts": row[1], "error": row[2], "output": row[3]}
+
+    def counts(self):
+        return dict(self.connection.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,33 @@
+# Seletores CSS dos cards de resultado de cada site. São compartilhados entre
+# a extração via WebDriver e qualquer outro consumidor da página de resultados,
+# para que uma correção de seletor valha para todos os caminhos.
+
+
+# Booking ------------------------------------------------------------------- #
+
+
+BOOKING_PROPERTY_CARD = "div[data-testid='property-card-container']"
+
+BOOKING_PROPERTY_FIELDS = {
+    "title"            : "div[data-testid='title']",
+    "address"          : "span[data-testid='address']",
+    "recommended_units": "div[data-testid='recommended-units']",
+    "review_score"     : "div[data-testid='review-score']",
+    "final_price"      : "span[data-testid='price-and-discounted-price']"
+}
+
+
+# Trivago ------------------------------------------------------------------- #
+
+
+TRIVAGO_PROPERTY_CARD = "li[data-testid='accommodation-list-element']"
+
+# O card do Trivago não exibe endereço; o campo é mantido como None para que o
+# esquema dos registros seja o mesmo do Booking.
+TRIVAGO_PROPERTY_FIELDS = {
+    "title"            : "section[data-testid='item-name-section']",
+    "address"          : None,
+    "recommended_units": "div[data-testid='hotel-highlights-wrapper']",
+    "review_score"     : "span[data-testid='aggregate-rating']",
+    "final_price"      : "div[data-testid='recommended-price']"
+}
@@ -0,0 +1,197 @@
+import os
+import sys
+import glob
+import json
+import hashlib
+import pandas as pd
+from uuid import uuid4
+from datetime import datetime
+from src.utils.logger import logger
+from src.utils.helpers import (slugify, parse_raw_filename)
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+RAW_STORE_DIR  = "data/raw_store"
+MANIFEST_FILE  = "manifest.jsonl"
+SCHEMA_VERSION = 1
+
+RAW_COLUMNS = ["title", "address", "recommended_units", "review_score", "final_price"]
+
+
+class RawStore:
+    # Armazena os registros brutos em Parquet, particionados por
+    # site/destino/data de coleta, com um manifesto (JSON lines, uma linha
+    # por arquivo) que permite escolher partições sem listar diretórios.
+    def __init__(self, root=RAW_STORE_DIR):
+        self.root          = root
+        self.manifest_file = os.path.join(root, MANIFEST_FILE)
+
+    def write(self, records, site, destination, scraped_at=None, source=None):
+        return self.write_frames([pd.DataFrame(records)], site, destination, scraped_at, source)
+
+    def write_csv(self, path, site, destination, scraped_at=None, chunksize=5000):
+        # Converte o CSV em blocos, sem carregar o arquivo inteiro em memória.
+        # Sem data explícita vale a do nome do arquivo, como no import_csv.
+        info       = parse_raw_filename(path)
+        scraped_at = scraped_at or (info["scraped_at"] if info else None)
+
+        frames = pd.read_csv(path, chunksize=chunksize) if os.path.getsize(path) > 0 else [pd.DataFrame()]
+        return self.write_frames(frames, site, destination, scraped_at, source=os.path.basename(path))
+
+    def normalize_frame(self, df, scraped_at):
+        for column in RAW_COLUMNS:
+            if column not in df.columns: df[column] = None
+
+        df = df[RAW_COLUMNS + [column for column in df.columns if column not in RAW_COLUMNS]].copy()
+        df[RAW_COLUMNS]  = df[RAW_COLUMNS].astype("string")
+        df["scraped_at"] = pd.Timestamp(scraped_at)
+
+        return df
+
+    def write_frames(self, frames, site, destination, scraped_at=None, source=None):
+        # pyarrow só é importado quando algo é gravado: quem coleta com
+        # save_parquet=False não depende dele
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        scraped_at = scraped_at or datetime.now()
+
+        partition = os.path.join(
+            "site={}".format(site.lower()),
+            "destination={}".format(slugify(destination)),
+            "scrape_date={:%Y-%m-%d}".format(scraped_at)
+        )
+        relative_path = os.path.join(partition, "part-{:%H%M%S}-{}.parquet".format(scraped_at, uuid4().hex[:8]))
+        path          = os.path.join(self.root, relative_path)
+
+        # Escrita em arquivo temporário + rename: leitores nunca veem um
+        # Parquet pela metade
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        writer  = None
+        rows    = 0
+        columns = None
+        try:
+            for df in frames:
+                df    = self.normalize_frame(df, scraped_at)
+                table = pa.Table.from_pandas(df, preserve_index=False)
+
+                if writer is None:
+                    writer  = pq.ParquetWriter(path + ".tmp", table.schema)
+                    columns = list(df.columns)
+                else:
+                    table = table.cast(writer.schema)
+
+                writer.write_table(table)
+                rows += len(df)
+        finally:
+            if writer is not None: writer.close()
+
+        os.replace(path + ".tmp", path)
+
+        entry = {
+            "path"          : relative_path,
+            "site"          : site.lower(),
+            "destination"   : destination,
+            "scrape_date"   : "{:%Y-%m-%d}".format(scraped_at),
+            "scraped_at"    : scraped_at.isoformat(timespec="seconds"),
+            "rows"          : rows,
+            "columns"       : columns,
+            "schema_version": SCHEMA_VERSION,
+            "sha256"        : self.checksum(path),
+            "source"        : source,
+            "created_at"    : datetime.now().isoformat(timespec="seconds")
+        }
+
+        # Uma linha por write() em modo append: seguro com vários workers
+        with open(self.manifest_file, 'a', encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        logger.info("{} registros gravados em {}.".format(rows, path))
+
+        return entry
+
+    @staticmethod
+    def checksum(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def manifest(self):
+        if not os.path.exists(self.manifest_file): return []
+
+        with open(self.manifest_file, 'r', encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def find(self, site=None, destination=None, date_from=None, date_to=None):
+        entries = []
+        for entry in self.manifest():
+            if (site is not None) and (entry["site"] != site.lower()): continue
+            if (destination is not None) and (slugify(entry["destination"]) != slugify(destination)): continue
+            if (date_from is not None) and (entry["scrape_date"] < str(date_from)): continue
+            if (date_to is not None) and (entry["scrape_date"] > str(date_to)): continue
+
+            entries.append(entry)
+
+        return entries
+
+    def read(self, columns=None, verify=False, **filters):
+        # Lê apenas as partições e colunas pedidas, acrescentando as chaves de
+        # partição como colunas
+        frames = []
+        for entry in self.find(**filters):
+            path = os.path.join(self.root, entry["path"])
+
+            if verify and (self.checksum(path) != entry["sha256"]):
+                raise ValueError("Checksum de {} não confere com o manifesto".format(path))
+
+            wanted = None if columns is None else [column for column in columns if column in entry["columns"]]
+            df     = pd.read_parquet(path, columns=wanted)
+
+            df["site"]        = entry["site"]
+            df["destination"] = entry["destination"]
+            df["scrape_date"] = entry["scrape_date"]
+            frames.append(df)
+
+        if not frames: return pd.DataFrame(columns=(columns or RAW_COLUMNS) + ["site", "destination", "scrape_date"])
+
+        return pd.concat(frames, ignore_index=True)
+
+    def import_csv(self, path):
+        info = parse_raw_filename(path)
+        assert info is not None, 'Nome de arquivo fora do padrão: "{}"'.format(path)
+
+        return self.write_csv(path, info["site"], info["destination"], info["scraped_at"])
+
+    def import_dir(self, input_dir):
+        imported = {entry.get("source") for entry in self.manifest()}
+
+        entries = []
+        for path in sorted(glob.glob(os.path.join(input_dir, "*.csv"))):
+            if os.path.basename(path) in imported: continue
+
+            if parse_raw_filename(path) is None:
+                logger.warning('Arquivo ignorado, nome fora do padrão: "{}"'.format(path))
+                continue
+
+            entries.append(self.import_csv(path))
+
+        logger.info("{} arquivos importados de {} para {}.".format(len(entries), input_dir, self.root))
+
+        return entries
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+if __name__ == "__main__":
+    logger.name = "raw_store.py"
+
+    input_dir = sys.argv[1] if len(sys.argv) > 1 else "data/raw"
+
+    RawStore().import_dir(input_dir)
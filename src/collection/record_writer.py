@@ -0,0 +1,78 @@
+import os
+import csv
+from src.utils.logger import logger
+from src.collection.raw_store import RAW_COLUMNS
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+class RecordWriter:
+    # Grava registros em CSV conforme são extraídos, em pequenos lotes, em um
+    # arquivo ".part". Só ao fechar com sucesso o arquivo é renomeado para o
+    # nome final (rename atômico); se o scraping quebrar no meio, o ".part"
+    # continua no disco com tudo o que já fora coletado.
+    def __init__(self, path, fieldnames=None, batch_size=10):
+        self.path         = path
+        self.partial_path = path + ".part"
+        self.fieldnames   = fieldnames
+        self.batch_size   = batch_size
+        self.buffer       = []
+        self.count        = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.file   = open(self.partial_path, 'w', encoding="utf-8", newline="")
+        self.writer = None
+
+    def write(self, record):
+        self.buffer.append(record)
+        self.count += 1
+
+        if len(self.buffer) >= self.batch_size: self.flush()
+
+    def get_writer(self, record=None):
+        if self.writer is None:
+            if self.fieldnames is None:
+                extra_fields    = [name for name in (record or {}) if name not in RAW_COLUMNS]
+                self.fieldnames = RAW_COLUMNS + extra_fields
+
+            self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames)
+            self.writer.writeheader()
+
+        return self.writer
+
+    def flush(self):
+        writer = self.get_writer(self.buffer[0] if self.buffer else None)
+        writer.writerows(self.buffer)
+        self.buffer = []
+
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+        os.replace(self.partial_path, self.path)
+
+        logger.info("{} registros gravados em {}.".format(self.count, self.path))
+
+        return self.path
+
+    def abort(self):
+        self.flush()
+        self.file.close()
+
+        logger.warning("Gravação interrompida: {} registros preservados em {}.".format(self.count, self.partial_path))
+
+        return self.partial_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None: self.close()
+        else: self.abort()
+
+        return False
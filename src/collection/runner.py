@@ -0,0 +1,375 @@
+import os
+import sys
+import pandas as pd
+from time import (sleep, perf_counter)
+from datetime import datetime
+from multiprocessing import (Pool, current_process)
+from multiprocessing.util import Finalize
+from src.utils.selenium import Selenium
+from src.utils.config import get_section
+from selenium.common import WebDriverException
+from src.utils.logger import (logger, configure_worker_logger)
+from src.utils.tracing import tracer
+from src.utils.helpers import parse_raw_filename
+from src.collection.job_queue import (JobQueue, JOB_QUEUE_FILE)
+from src.collection.booking_scrapper import BookingScrapper
+from src.collection.trivago_scrapper import TrivagoScrapper
+from src.collection.scraping import (
+    start_booking_scrapper_scrapping,
+    start_trivago_scrapper_scrapping,
+    start_price_calendar_scrapping
+)
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+SITES = {
+    "booking": (BookingScrapper, start_booking_scrapper_scrapping),
+    "trivago": (TrivagoScrapper, start_trivago_scrapper_scrapping),
+}
+
+PROFILES_DIR = "data/profiles"
+
+# Campos usados pelo runner e pela fila, que não são repassados ao scrapper
+JOB_CONTROL_FIELDS = ("site", "output_dir", "batch", "job_key", "queue_path")
+
+# Driver e conexão com a fila do processo worker atual (um por processo,
+# reutilizados entre jobs).
+_selenium_utils = None
+_job_queue      = None
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def init_worker():
+    global _selenium_utils
+
+    worker_name = get_worker_name()
+    configure_worker_logger(worker_name)
+    tracer.set_process(worker_name)
+
+    logger.info("Inicializando worker {}...".format(worker_name))
+
+    # Uma falha aqui não derruba o pool: o driver é criado no primeiro job
+    try:
+        _selenium_utils = create_selenium()
+    except Exception as error:
+        logger.exception("Não foi possível criar o driver do worker {}: {}".format(worker_name, error))
+
+    # Pool.close()/join() encerram os workers normalmente, o que executa os
+    # finalizadores registrados e fecha o navegador deste processo.
+    Finalize(None, teardown_worker, exitpriority=10)
+
+    logger.info("Worker {} iniciado.".format(worker_name))
+
+def create_selenium():
+    profiles_dir = get_section("selenium").get("profiles_dir", PROFILES_DIR)
+
+    return Selenium(user_data_dir=os.path.join(profiles_dir, get_worker_name()))
+
+def get_selenium():
+    # Driver do worker, criado de novo se o anterior foi descartado
+    global _selenium_utils
+
+    if _selenium_utils is None: _selenium_utils = create_selenium()
+
+    return _selenium_utils
+
+def recycle_selenium():
+    # Entre jobs o driver é apenas limpo; ele só é recriado após muitos jobs
+    # ou crescimento de memória, ou se a limpeza falhar (navegador morto)
+    global _selenium_utils
+
+    if _selenium_utils is None: return
+
+    recycle = get_section("selenium").get("recycle") or {}
+
+    _selenium_utils.jobs_served += 1
+    try:
+        if not _selenium_utils.should_recycle(recycle.get("max_jobs"), recycle.get("max_memory_mb")):
+            _selenium_utils.reset()
+            return
+    except WebDriverException as error:
+        logger.warning("Driver não respondeu à limpeza e será recriado: {}".format(error.msg))
+
+    try:
+        _selenium_utils.teardown()
+    except WebDriverException:
+        pass
+
+    # Descartado antes de recriar: se a criação falhar, o próximo job tenta
+    # de novo em vez de reutilizar um driver encerrado
+    _selenium_utils = None
+    _selenium_utils = create_selenium()
+
+def teardown_worker():
+    global _selenium_utils, _job_queue
+
+    if _selenium_utils is not None:
+        _selenium_utils.teardown()
+        _selenium_utils = None
+
+    if _job_queue is not None:
+        _job_queue.close()
+        _job_queue = None
+
+def get_worker_name():
+    return current_process().name.replace("ForkPoolWorker", "worker").replace("SpawnPoolWorker", "worker")
+
+def get_job_queue(queue_path):
+    global _job_queue
+
+    if (_job_queue is None) or (_job_queue.path != queue_path):
+        _job_queue = JobQueue(queue_path)
+
+    return _job_queue
+
+def get_job_arguments(job):
+    return {key: value for key, value in job.items() if key not in JOB_CONTROL_FIELDS}
+
+def get_output_name(job, suffix):
+    scrapper_class, _ = SITES[job["site"].lower()]
+    formatted_time    = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+
+    return "{} {} {} {}".format(scrapper_class.__name__.replace("Scrapper", ""), job["location"], formatted_time, suffix)
+
+def run_job(job):
+    global _selenium_utils
+
+    site = job["site"].lower()
+    assert site in SITES, 'O site "{}" não é suportado'.format(job["site"])
+
+    scrapper_class, start_scrapping = SITES[site]
+
+    # Jobs com intervalo de datas são varreduras de calendário, feitas em uma
+    # única sessão do driver
+    if "start_date" in job: start_scrapping = start_price_calendar_scrapping
+
+    worker_name = get_worker_name()
+    output_name = get_output_name(job, worker_name)
+
+    # Registros parciais vão para a fila conforme são extraídos, para não se
+    # perderem se o job morrer no meio
+    checkpoint = None
+    if job.get("queue_path"):
+        job_queue  = get_job_queue(job["queue_path"])
+        checkpoint = lambda records: job_queue.checkpoint(job["job_key"], records)
+
+    logger.info('Executando job "{}" para "{}"...'.format(site, job["location"]))
+
+    start  = perf_counter()
+    result = {"job": job, "worker": worker_name, "status": "done", "output": None, "error": None, "timings": None}
+    try:
+        with tracer.span("run_job", site=site, location=job["location"], job_key=job.get("job_key")):
+            selenium_utils = get_selenium()
+            selenium_utils.pacing.reset()
+
+            bot = scrapper_class(selenium_utils, open_home=not job.get("direct_url", True))
+            result["output"] = start_scrapping(
+                bot, output_dir=job["output_dir"], output_name=output_name, checkpoint=checkpoint, **get_job_arguments(job)
+            )
+    except Exception as error:
+        logger.exception('Job "{}" para "{}" falhou: {}'.format(site, job["location"], error))
+        result["status"] = "failed"
+        result["error"]  = "{}: {}".format(error.__class__.__name__, error)
+    finally:
+        result["elapsed"] = perf_counter() - start
+        if _selenium_utils is not None: result["timings"] = _selenium_utils.pacing.log_report()
+
+        # Falha ao limpar ou recriar o driver não derruba o lote: o worker
+        # fica sem driver e o próximo job tenta criá-lo
+        try:
+            recycle_selenium()
+        except Exception as error:
+            logger.exception("Falha ao reciclar o driver do worker {}: {}".format(worker_name, error))
+            _selenium_utils = None
+
+        tracer.export_metrics()
+
+    logger.info('Job "{}" para "{}" finalizado em {:.1f}s.'.format(site, job["location"], result["elapsed"]))
+
+    return result
+
+def save_partial_results(job_queue, key, job):
+    records = job_queue.get_checkpoint(key)
+    if not records: return None
+
+    os.makedirs(job["output_dir"], exist_ok=True)
+    output_file = os.path.join(job["output_dir"], "{}.csv".format(get_output_name(job, "parcial")))
+    pd.DataFrame(records).to_csv(output_file, index=False)
+
+    logger.warning("{} registros parciais do job {} salvos em {}.".format(len(records), key, output_file))
+
+    return output_file
+
+def prepare_jobs(jobs, output_dir, batch=None):
+    batch = batch or datetime.now().strftime("%Y-%m-%d")
+
+    return [dict(job, batch=batch, output_dir=job.get("output_dir", output_dir)) for job in jobs]
+
+def run_jobs(jobs, output_dir, workers=2, queue_path=JOB_QUEUE_FILE, batch=None, retry_failed=True):
+    # Jobs de um mesmo lote (por padrão, o dia) compartilham a chave na fila:
+    # rodar de novo no mesmo dia retoma o lote, pula o que já terminou e
+    # (com retry_failed) tenta de novo o que falhou.
+    jobs      = prepare_jobs(jobs, output_dir, batch)
+    batch     = jobs[0]["batch"] if jobs else batch
+    job_queue = JobQueue(queue_path)
+
+    keys = job_queue.enqueue(jobs)
+    job_queue.recover()
+    if retry_failed: job_queue.retry_failed(keys)
+
+    pending_keys = [key for key in keys if job_queue.get_job(key)["state"] == "pending"]
+    logger.info("{} de {} jobs do lote {} pendentes.".format(len(pending_keys), len(keys), batch))
+
+    results = []
+    if not pending_keys:
+        job_queue.close()
+        return results
+
+    workers = max(1, min(workers, len(pending_keys)))
+    logger.info("Distribuindo {} jobs entre {} workers...".format(len(pending_keys), workers))
+
+    start   = perf_counter()
+    running = {}
+
+    # Sem "with": o __exit__ do Pool chama terminate(), que mata os workers
+    # sem rodar os finalizadores e deixaria navegadores abertos.
+    pool = Pool(processes=workers, initializer=init_worker)
+    try:
+        while True:
+            while len(running) < workers:
+                claimed = job_queue.claim(keys)
+                if claimed is None: break
+
+                key, job = claimed
+                running[key] = pool.apply_async(run_job, (dict(job, job_key=key, queue_path=queue_path),))
+
+            if not running:
+                wait = job_queue.next_attempt_in(keys)
+                if wait is None: break
+
+                sleep(min(wait, 5))
+                continue
+
+            finished = [key for key, async_result in running.items() if async_result.ready()]
+            if not finished:
+                sleep(0.5)
+                continue
+
+            for key in finished:
+                result = running.pop(key).get()
+                results.append(result)
+
+                if result["status"] == "done":
+                    job_queue.complete(key, result["output"])
+                elif job_queue.fail(key, result["error"]) == "failed":
+                    result["output"] = save_partial_results(job_queue, key, result["job"])
+
+            logger.info("Fila: {}".format(job_queue.counts()))
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        job_queue.close()
+
+    tracer.export_metrics()
+
+    failed = [result for result in results if result["status"] != "done"]
+    logger.info(
+        "{} execuções finalizadas em {:.1f}s ({} com falha).".format(len(results), perf_counter() - start, len(failed))
+    )
+
+    return results
+
+
+def merge_site_outputs(location, outputs, output_dir):
+    # Une os CSVs de cada site em um único conjunto de registros, marcado com
+    # o site de origem e o horário em que cada job começou a coleta. O horário
+    # vem do nome do arquivo, gerado no início do job: o mtime é o do fim da
+    # escrita (ou de uma cópia posterior).
+    frames = []
+    for site, output_file in outputs:
+        if (output_file is None) or (not os.path.exists(output_file)):
+            logger.warning('Sem resultados de "{}" para "{}".'.format(site, location))
+            continue
+
+        info       = parse_raw_filename(output_file)
+        scraped_at = info["scraped_at"] if info else datetime.fromtimestamp(os.path.getmtime(output_file))
+
+        df = pd.read_csv(output_file)
+        df["source_site"] = site
+        df["scraped_at"]  = scraped_at.isoformat(timespec="seconds")
+        frames.append(df)
+
+    if not frames: return None
+
+    formatted_time = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+    merged_file    = os.path.join(output_dir, "Merged {} {}.csv".format(location, formatted_time))
+    pd.concat(frames, ignore_index=True).to_csv(merged_file, index=False)
+
+    logger.info('Resultados de {} sites para "{}" unidos em {}.'.format(len(frames), location, merged_file))
+
+    return merged_file
+
+def scrape_destinations(
+        destinations,
+        output_dir,
+        sites=("booking", "trivago"),
+        site_options=None,
+        workers=None,
+        queue_path=JOB_QUEUE_FILE,
+        batch=None
+):
+    # Cada destino vira um job por site; com ao menos um worker por site, os
+    # sites de um mesmo destino rodam ao mesmo tempo, cada um no seu driver
+    site_options = site_options or {}
+
+    jobs = []
+    for destination in destinations:
+        for site in sites:
+            jobs.append(dict(destination, site=site, **site_options.get(site, {})))
+
+    jobs = prepare_jobs(jobs, output_dir, batch)
+    run_jobs(jobs, output_dir, workers=workers or len(sites), queue_path=queue_path, batch=jobs[0]["batch"])
+
+    job_queue = JobQueue(queue_path)
+    merged    = {}
+    try:
+        for destination in destinations:
+            outputs = []
+            for job in jobs:
+                if any(job.get(key) != value for key, value in destination.items()): continue
+
+                state = job_queue.get_job(JobQueue.job_key(job))
+                outputs.append((job["site"], state["output"] if state else None))
+
+            merged[destination["location"]] = merge_site_outputs(destination["location"], outputs, output_dir)
+    finally:
+        job_queue.close()
+
+    return merged
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+if __name__ == "__main__":
+    logger.name = "runner.py"
+
+    workers       = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    SCRAPPING_DIR = "data/raw"
+
+    destinations = [
+        {"location": "Tiradentes Minas Gerais", "day": "01", "month": "10", "year": "2025"},
+        {"location": "Gramado Rio Grande do Sul", "day": "01", "month": "10", "year": "2025"},
+    ]
+    site_options = {
+        "booking": {"days_in": "1", "language": "pt-br", "coin": "brl"},
+    }
+
+    scrape_destinations(destinations, SCRAPPING_DIR, site_options=site_options, workers=workers)
@@ -1,12 +1,20 @@
 
 import os
-import pandas as pd
-from datetime import datetime
+from datetime import (datetime, date, timedelta)
 from random import (sample, random)
 from src.utils.logger import logger
+from src.utils.tracing import (tracer, traced)
 from src.utils.selenium import Selenium
 from src.collection.booking_scrapper import BookingScrapper
 from src.collection.trivago_scrapper import TrivagoScrapper
+from src.collection.raw_store import RawStore
+from src.collection.record_writer import RecordWriter
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+CHECKPOINT_BATCH_SIZE = 10
 
 
 # Functions ----------------------------------------------------------------- #
@@ -16,26 +24,78 @@ def random_order(*actions):
     for func, *args in sample(actions, len(actions)):
         func(*args)
 
-def start_booking_scrapper_scrapping(
+def collect_records(records, sink, checkpoint=None, batch_size=CHECKPOINT_BATCH_SIZE):
+    # Consome os registros (lista ou gerador) entregando cada um ao destino
+    # (arquivo ou lista) e ao checkpoint em lotes, para que o que já foi
+    # extraído sobreviva a uma falha no meio
+    total = 0
+    batch = []
+    for record in records:
+        sink(record)
+        batch.append(record)
+        total += 1
+
+        if checkpoint and (len(batch) >= batch_size):
+            checkpoint(batch)
+            batch = []
+
+    if checkpoint and batch: checkpoint(batch)
+
+    return total
+
+def tag_stay(records, checkin, nights):
+    # Estadia pesquisada em cada registro: o índice de snapshots compara o
+    # mesmo hotel e a mesma estadia entre coletas de dias diferentes
+    checkout = checkin + timedelta(days=nights)
+    for record in records:
+        record["checkin"]  = checkin.isoformat()
+        record["checkout"] = checkout.isoformat()
+        record["nights"]   = nights
+
+        yield record
+
+def plan_date_matrix(start_date, end_date, stays=(1,)):
+    # Todas as combinações (check-in, noites) do intervalo, sem repetição e
+    # em ordem, para que datas vizinhas sejam pesquisadas em sequência
+    start_date = date.fromisoformat(start_date) if isinstance(start_date, str) else start_date
+    end_date   = date.fromisoformat(end_date) if isinstance(end_date, str) else end_date
+    assert start_date <= end_date, "A data inicial deve ser anterior ou igual à final"
+
+    stays = sorted({int(nights) for nights in stays})
+    assert stays and stays[0] >= 1, "As estadias devem ter ao menos uma noite"
+
+    days = (end_date - start_date).days + 1
+    return [(start_date + timedelta(days=offset), nights) for offset in range(days) for nights in stays]
+
+def search_booking(
+        booking_bot,
         location,
-        day,
-        month,
-        year,
-        days_in,
-        language,
-        coin,
-        output_dir,
+        checkin,
+        nights,
+        days_in="exact",
+        language="pt-br",
+        coin="brl",
         accept_cookie_prob=0.5,
-        save_csv=True
+        direct_url=True
 ):
-    logger.info("Iniciando scrapping...")
+    # days_in é a janela de flexibilidade do Booking (±N dias), não a
+    # estadia: as noites só definem o checkout
+    checkout = checkin + timedelta(days=nights)
 
-    start_time           = datetime.now()
-    formatted_start_time = start_time.strftime("%d-%m-%Y %H:%M:%S")
+    # A URL direta já leva idioma, moeda, datas e o filtro de hotel; o
+    # formulário só é usado quando ela não retorna resultados
+    searched = direct_url and booking_bot.open_search_url(
+        booking_bot.build_search_url(location, checkin, checkout, language, coin, days_in)
+    )
+    if searched: return
+
+    if direct_url: booking_bot.open_home()
 
     if random() <= accept_cookie_prob: booking_bot.decline_cookie()
     else: booking_bot.accept_cookie()
 
+    day, month, year = "{:%d}".format(checkin), "{:%m}".format(checkin), "{:%Y}".format(checkin)
+
     random_order(
         (booking_bot.select_idiom, language),
         (booking_bot.select_coin, coin)
@@ -48,49 +108,221 @@ def start_booking_scrapper_scrapping(
     booking_bot.search()
     booking_bot.set_hotel_filter()
 
-    property_elements    = booking_bot.get_property_elements()
-    property_information = booking_bot.get_property_information(property_elements)
+def search_trivago(trivago_bot, location, checkin, nights, direct_url=True):
+    checkout = checkin + timedelta(days=nights)
+
+    searched = direct_url and trivago_bot.open_search_url(
+        trivago_bot.build_search_url(location, checkin, checkout)
+    )
+    if searched: return
+
+    if direct_url: trivago_bot.open_home()
+
+    day, month, year = "{:%d}".format(checkin), "{:%m}".format(checkin), "{:%Y}".format(checkin)
+
+    random_order(
+        (trivago_bot.set_destination, location),
+        (trivago_bot.set_dates, day, month, year)
+    )
+    trivago_bot.search()
+    trivago_bot.set_hotel_filter()
+
+    if direct_url: trivago_bot.remember_search_url(location)
+
+def extract_property_information(bot, bulk_extraction=True, streaming=False, stream_limits=None):
+    if streaming:
+        return bot.iter_property_information(**(stream_limits or {}))
+
+    property_elements = bot.get_property_elements()
+    return bot.get_property_information(property_elements, bulk=bulk_extraction)
+
+def save_property_information(
+        bot,
+        property_information,
+        location,
+        output_dir,
+        output_name,
+        save_csv=True,
+        save_html=True,
+        save_parquet=True,
+        checkpoint=None
+):
+    # Os registros são consumidos aqui, à medida que são extraídos. Com CSV,
+    # vão direto para o disco em lotes e nunca ficam todos em memória; se o
+    # navegador cair no meio, o que já foi coletado fica no arquivo ".part".
+    SCRAPPING_FILE = None
+    site           = bot.get_name().replace("Scrapper", "")
 
     if save_csv:
-        df = pd.DataFrame(property_information)
+        SCRAPPING_FILE = os.path.join(output_dir, f"{output_name}.csv")
+        with RecordWriter(SCRAPPING_FILE) as writer:
+            collect_records(property_information, writer.write, checkpoint)
+
+        # Página de resultados salva ao lado do CSV, para reprocessamento
+        # offline com src.collection.html_parser
+        if save_html: bot.selenium_utils.save_page_source(os.path.join(output_dir, f"{output_name}.html"))
+
+        # Cópia colunar particionada por site/destino/data, lida pelas etapas
+        # seguintes sem precisar reprocessar os CSVs
+        if save_parquet: RawStore().write_csv(SCRAPPING_FILE, site, location)
+
+        return SCRAPPING_FILE
+
+    records = []
+    collect_records(property_information, records.append, checkpoint)
+
+    if save_parquet: RawStore().write(records, site, location)
 
-        os.makedirs(output_dir, exist_ok=True)
-        SCRAPPING_FILE = os.path.join(output_dir, f"Booking {location} {formatted_start_time}.csv")
-        df.to_csv(SCRAPPING_FILE, index=False)
+    return SCRAPPING_FILE
+
+@traced()
+def start_booking_scrapper_scrapping(
+        booking_bot,
+        location,
+        day,
+        month,
+        year,
+        days_in,
+        language,
+        coin,
+        output_dir,
+        accept_cookie_prob=0.5,
+        save_csv=True,
+        output_name=None,
+        bulk_extraction=True,
+        streaming=False,
+        stream_limits=None,
+        save_html=True,
+        checkpoint=None,
+        direct_url=True,
+        nights=1,
+        save_parquet=True
+):
+    logger.info("Iniciando scrapping...")
+
+    start_time           = datetime.now()
+    formatted_start_time = start_time.strftime("%d-%m-%Y %H:%M:%S")
+
+    checkin = date(int(year), int(month), int(day))
+    search_booking(booking_bot, location, checkin, nights, days_in, language, coin, accept_cookie_prob, direct_url)
+
+    property_information = tag_stay(
+        extract_property_information(booking_bot, bulk_extraction, streaming, stream_limits), checkin, nights
+    )
+
+    if output_name is None: output_name = f"Booking {location} {formatted_start_time}"
+    SCRAPPING_FILE = save_property_information(
+        booking_bot, property_information, location, output_dir, output_name, save_csv, save_html, save_parquet, checkpoint
+    )
 
     logger.info("Scrapping finalizado.")
 
+    return SCRAPPING_FILE
+
+@traced()
 def start_trivago_scrapper_scrapping(
+        trivago_bot,
         location,
         day,
         month,
         year,
         output_dir,
-        save_csv=True
+        save_csv=True,
+        output_name=None,
+        bulk_extraction=True,
+        streaming=False,
+        stream_limits=None,
+        save_html=True,
+        checkpoint=None,
+        direct_url=True,
+        nights=1,
+        save_parquet=True
 ):
     logger.info("Iniciando scrapping...")
 
     start_time           = datetime.now()
     formatted_start_time = start_time.strftime("%d-%m-%Y %H:%M:%S")
 
-    random_order(
-        (trivago_bot.set_destination, location),
-        (trivago_bot.set_dates, day, month, year)
+    checkin = date(int(year), int(month), int(day))
+    search_trivago(trivago_bot, location, checkin, nights, direct_url)
+
+    property_information = tag_stay(
+        extract_property_information(trivago_bot, bulk_extraction, streaming, stream_limits), checkin, nights
     )
-    trivago_bot.search()
-    trivago_bot.set_hotel_filter()
 
-    property_elements    = trivago_bot.get_property_elements()
-    property_information = trivago_bot.get_property_information(property_elements)
+    if output_name is None: output_name = f"Trivago {location} {formatted_start_time}"
+    SCRAPPING_FILE = save_property_information(
+        trivago_bot, property_information, location, output_dir, output_name, save_csv, save_html, save_parquet, checkpoint
+    )
 
-    if save_csv:
-        df = pd.DataFrame(property_information)
+    logger.info("Scrapping finalizado.")
 
-        os.makedirs(output_dir, exist_ok=True)
-        SCRAPPING_FILE = os.path.join(output_dir, f"Trivago {location} {formatted_start_time}.csv")
-        df.to_csv(SCRAPPING_FILE, index=False)
+    return SCRAPPING_FILE
 
-    logger.info("Scrapping finalizado.")
+@traced()
+def start_price_calendar_scrapping(
+        bot,
+        location,
+        start_date,
+        end_date,
+        output_dir,
+        stays=(1,),
+        save_csv=True,
+        output_name=None,
+        bulk_extraction=True,
+        streaming=False,
+        stream_limits=None,
+        checkpoint=None,
+        save_parquet=True,
+        **search_options
+):
+    # Varre uma matriz de datas na mesma sessão: a primeira data passa pela
+    # pesquisa completa e as seguintes apenas trocam as datas na URL de
+    # resultados atual, que já carrega destino, idioma, moeda e filtros
+    logger.info("Iniciando varredura de calendário de preços...")
+
+    start_time           = datetime.now()
+    formatted_start_time = start_time.strftime("%d-%m-%Y %H:%M:%S")
+
+    site        = bot.get_name().replace("Scrapper", "")
+    search      = search_booking if isinstance(bot, BookingScrapper) else search_trivago
+    date_matrix = plan_date_matrix(start_date, end_date, stays)
+
+    logger.info("{} combinações de data e estadia planejadas para \"{}\".".format(len(date_matrix), location))
+
+    def iter_calendar_records():
+        # Gerador: cada data só é pesquisada quando os registros da anterior
+        # já foram gravados. Uma data sem resultados (ou com erro) é pulada;
+        # a seguinte volta à pesquisa completa, já que a página pode ter
+        # ficado em um estado qualquer.
+        failures     = 0
+        needs_search = True
+        for checkin, nights in date_matrix:
+            checkout = checkin + timedelta(days=nights)
+
+            try:
+                if needs_search or (not bot.change_dates(checkin, checkout)):
+                    search(bot, location, checkin, nights, **search_options)
+                needs_search = False
+
+                yield from tag_stay(
+                    extract_property_information(bot, bulk_extraction, streaming, stream_limits), checkin, nights
+                )
+            except Exception as error:
+                failures    += 1
+                needs_search = True
+                logger.warning("Data {} ({} noites) pulada: {}".format(checkin, nights, error))
+
+        if failures == len(date_matrix): raise RuntimeError("Nenhuma data da varredura retornou resultados")
+
+    if output_name is None: output_name = f"{site} {location} {formatted_start_time} calendario"
+    SCRAPPING_FILE = save_property_information(
+        bot, iter_calendar_records(), location, output_dir, output_name, save_csv, False, save_parquet, checkpoint
+    )
+
+    logger.info("Varredura de calendário finalizada.")
+
+    return SCRAPPING_FILE
 
 
 # Init ---------------------------------------------------------------------- #
@@ -110,8 +342,13 @@ if __name__ == "__main__":
     days_in       = "1"
     SCRAPPING_DIR = "../../data/raw"
 
-    booking_bot = BookingScrapper(selenium_utils)
-    #start_booking_scrapper_scrapping(location, day, month, year, days_in, language, coin, SCRAPPING_DIR)
+    booking_bot = BookingScrapper(selenium_utils, open_home=False)
+    #start_booking_scrapper_scrapping(booking_bot, location, day, month, year, days_in, language, coin, SCRAPPING_DIR)
+
+    trivago_bot = TrivagoScrapper(selenium_utils, open_home=False)
+    start_trivago_scrapper_scrapping(trivago_bot, location, day, month, year, SCRAPPING_DIR)
+
+    selenium_utils.pacing.log_report()
+    selenium_utils.teardown()
 
-    trivago_bot = TrivagoScrapper(selenium_utils)
-    start_trivago_scrapper_scrapping(location, day, month, year, SCRAPPING_DIR)
+    tracer.export_metrics()
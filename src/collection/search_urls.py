@@ -0,0 +1,38 @@
+import os
+import json
+from src.utils.logger import logger
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+SEARCH_URLS_FILE = "data/state/search_urls.json"
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def load_search_urls(path=SEARCH_URLS_FILE):
+    if not os.path.exists(path): return {}
+
+    with open(path, 'r', encoding="utf-8") as f:
+        return json.load(f)
+
+def get_search_url(site, destination, path=SEARCH_URLS_FILE):
+    return load_search_urls(path).get(site, {}).get(destination.lower())
+
+def remember_search_url(site, destination, url, path=SEARCH_URLS_FILE):
+    # Guarda a URL de resultados produzida pelo formulário, para que próximas
+    # pesquisas do mesmo destino possam ir direto a ela trocando só as datas.
+    # Escrita atômica: vários workers podem atualizar o arquivo.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    search_urls = load_search_urls(path)
+    search_urls.setdefault(site, {})[destination.lower()] = url
+
+    temp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(temp_path, 'w', encoding="utf-8") as f:
+        json.dump(search_urls, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+    logger.info('URL de pesquisa de "{}" em {} memorizada.'.format(destination, site))
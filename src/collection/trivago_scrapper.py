@@ -1,10 +1,13 @@
 
-from time import sleep
+import re
 from datetime import datetime
 from src.utils.logger import logger
+from src.utils.tracing import traced
 from src.utils.selenium import Selenium
+from src.collection.page_selectors import (TRIVAGO_PROPERTY_CARD, TRIVAGO_PROPERTY_FIELDS)
+from src.collection.search_urls import (get_search_url, remember_search_url)
 from selenium.webdriver.common.by import By
-from random import (randint, uniform, random)
+from random import random
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common import StaleElementReferenceException, TimeoutException
 
@@ -12,8 +15,12 @@ from selenium.common import StaleElementReferenceException, TimeoutException
 # Init ---------------------------------------------------------------------- #
 
 
+# Intervalo de datas dentro do parâmetro "search" da URL de resultados
+DATE_RANGE_PATTERN = re.compile(r"dr-\d{8}-\d{8}")
+
+
 class TrivagoScrapper:
-    def __init__(self, selenium_utils: Selenium):
+    def __init__(self, selenium_utils: Selenium, open_home=True):
         logger.name = "{}".format(self.get_name())
 
         logger.info("Inicializando {}...".format(self.get_name()))
@@ -21,21 +28,23 @@ class TrivagoScrapper:
         self.base_url       = "https://www.trivago.com.br/pt-BR/"
         self.selenium_utils = selenium_utils
 
-        self.selenium_utils.get(self.base_url)
+        if open_home: self.open_home()
 
         logger.info("{} iniciado.".format(self.get_name()))
 
+    @traced()
     def set_destination(self, destination):
         logger.info('Configurando destino para "{}"...'.format(destination))
 
         element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "input[id='input-auto-complete']")))
-        sleep(uniform(0.5, 2))
+        self.selenium_utils.pause(0.5, 2)
         self.selenium_utils.click(element)
 
         self.selenium_utils.type(destination)
 
         logger.info("Destino configurado.")
 
+    @traced()
     def set_dates(self, day, month, year):
         logger.info(
             'Configurando data de check-in para: "dia={0}", "mês={1}", "ano={2}"...'.format(
@@ -44,87 +53,115 @@ class TrivagoScrapper:
         )
 
         element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[data-testid='search-form-calendar']")))
-        sleep(uniform(0.5, 2))
+        self.selenium_utils.pause(0.5, 2)
         self.selenium_utils.click(element)
 
         now_month = int(datetime.now().month)
         assert (int(month) == now_month) or (int(month) == (now_month + 1)), "O mês deve ser o atual, ou o próximo, considerando a data da máquina local"
         element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[data-testid='valid-calendar-day-{0}-{1}-{2}']".format(year, month, day))))
-        sleep(uniform(0.5, 2))
+        self.selenium_utils.pause(0.5, 2)
         #assert int(element.text) == int(day)
         self.selenium_utils.click(element)
 
         logger.info("Data de check-in configurada.")
 
+    @traced()
     def search(self):
         logger.info("Pesquisando...")
 
         element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[data-testid='search-button-with-loader']")))
-        sleep(uniform(0.5, 2))
+        self.selenium_utils.pause(0.5, 2)
         self.selenium_utils.click(element)
 
         logger.info("Pesquisa realizada.")
 
+    @traced()
     def set_hotel_filter(self):
         logger.info("Filtrando tipo de propriedade para hotel...")
 
         element = self.selenium_utils.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[name='more_filters']")))
-        sleep(random())
+        self.selenium_utils.pause(0, 1)
         self.selenium_utils.click(element)
 
         element = self.selenium_utils.wait.until(
             EC.element_to_be_clickable((By.CSS_SELECTOR, "input[data-testid='popular-filters-category-checkbox-101/2']")))
-        sleep(random())
+        self.selenium_utils.pause(0, 1)
         self.selenium_utils.click(element)
 
         element = self.selenium_utils.wait.until(
             EC.element_to_be_clickable(
                 (By.CSS_SELECTOR, "button[data-testid='filters-popover-apply-button']")))
-        sleep(uniform(3, 5))
+        self.selenium_utils.pause(3, 5)
         self.selenium_utils.click(element)
 
         logger.info("Tipo de propriedade filtrado para hotel.")
 
-    def get_property_elements(self):
+    @traced()
+    def get_property_elements(self, max_steps=200):
         logger.info("Obtendo elementos das propriedades...")
 
-        while True:
-            last_height = self.selenium_utils.driver.execute_script("return document.body.scrollHeight")
-
+        for _ in range(max_steps):
             if random() <= 0.20:
                 self.selenium_utils.scroll_up()
-                sleep(uniform(0.5, 2))
+                self.selenium_utils.pause(0.5, 2)
 
             self.selenium_utils.scroll_down()
 
-            if random() <= 0.20: sleep(randint(1, 3))
+            if random() <= 0.20: self.selenium_utils.pause(1, 3)
 
             new_height = self.selenium_utils.driver.execute_script("return window.pageYOffset + window.innerHeight")
             total_height = self.selenium_utils.driver.execute_script("return document.body.scrollHeight")
 
-            if new_height >= (total_height * 0.98):
-                elements = self.selenium_utils.wait.until(EC.visibility_of_all_elements_located((By.CSS_SELECTOR, "li[data-testid='accommodation-list-element']")))
-                assert len(elements) > 0, "Nenhuma propriedade fora encontrada"
-                logger.info("Elementos das propriedades obtidos.")
-                return elements
-
-    def get_property_information(self, elements: list):
+            if new_height >= (total_height * 0.98): break
+        else:
+            logger.warning("Limite de {} rolagens atingido antes do fim da página.".format(max_steps))
+
+        elements = self.selenium_utils.wait.until(EC.visibility_of_all_elements_located((By.CSS_SELECTOR, TRIVAGO_PROPERTY_CARD)))
+        assert len(elements) > 0, "Nenhuma propriedade fora encontrada"
+        logger.info("Elementos das propriedades obtidos.")
+        return elements
+
+    @traced()
+    def iter_property_information(self, max_records=None, max_seconds=None, max_stale_steps=3, max_steps=200):
+        logger.info("Obtendo informações das propriedades durante a rolagem...")
+
+        self.selenium_utils.wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, TRIVAGO_PROPERTY_CARD)))
+
+        total = 0
+        for record in self.selenium_utils.iter_records_while_scrolling(
+                TRIVAGO_PROPERTY_CARD,
+                TRIVAGO_PROPERTY_FIELDS,
+                max_records=max_records,
+                max_seconds=max_seconds,
+                max_stale_steps=max_stale_steps,
+                max_steps=max_steps
+        ):
+            total += 1
+            yield record
+
+        assert total > 0, "Nenhuma propriedade fora encontrada"
+        logger.info("Informações de {} propriedades obtidas.".format(total))
+
+    @traced()
+    def get_property_information(self, elements: list, bulk=False):
         logger.info("Obtendo informações das propriedades...")
 
+        if bulk:
+            # Uma única chamada execute_script lê todos os campos de todos os cards
+            properties_information = self.selenium_utils.extract_records(
+                elements if elements is not None else TRIVAGO_PROPERTY_CARD, TRIVAGO_PROPERTY_FIELDS
+            )
+
+            logger.info("Informações das propriedades obtidas.")
+
+            return properties_information
+
         properties_information = []
         for element in elements:
             try:
-                title             = element.find_element(By.CSS_SELECTOR, "section[data-testid='item-name-section']").text
-                recommended_units = element.find_element(By.CSS_SELECTOR, "div[data-testid='hotel-highlights-wrapper']").text
-                review_score      = element.find_element(By.CSS_SELECTOR, "span[data-testid='aggregate-rating']").text
-                final_price       = element.find_element(By.CSS_SELECTOR, "div[data-testid='recommended-price']").text
-
                 properties_information.append({
-                    "title"            : title,
-                    "address"          : None,
-                    "recommended_units": recommended_units,
-                    "review_score"     : review_score,
-                    "final_price"      : final_price
+                    name: element.find_element(By.CSS_SELECTOR, selector).text if selector else None
+                    for name, selector in TRIVAGO_PROPERTY_FIELDS.items()
                 })
             except:
                 logger.warning(f"Erro ao obter informações do elemento: '''{element.text}'''")
@@ -133,5 +170,47 @@ class TrivagoScrapper:
 
         return properties_information
 
+    def build_search_url(self, destination, checkin, checkout):
+        # A URL do Trivago identifica o destino por um id interno, que só é
+        # conhecido após uma pesquisa pelo formulário. Por isso a URL direta é
+        # a última URL de resultados do destino com as datas trocadas.
+        url = get_search_url("trivago", destination)
+        if (url is None) or (not DATE_RANGE_PATTERN.search(url)): return None
+
+        return DATE_RANGE_PATTERN.sub("dr-{:%Y%m%d}-{:%Y%m%d}".format(checkin, checkout), url)
+
+    def remember_search_url(self, destination):
+        remember_search_url("trivago", destination, self.selenium_utils.driver.current_url)
+
+    @traced()
+    def open_search_url(self, url):
+        if url is None: return False
+
+        logger.info('Abrindo pesquisa direta "{}"...'.format(url))
+
+        self.selenium_utils.get(url)
+
+        try:
+            self.selenium_utils.wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, TRIVAGO_PROPERTY_CARD)))
+        except TimeoutException:
+            logger.warning("Pesquisa direta não retornou propriedades.")
+            return False
+
+        logger.info("Pesquisa direta aberta.")
+
+        return True
+
+    @traced()
+    def change_dates(self, checkin, checkout):
+        # Reaproveita a pesquisa atual trocando só o intervalo de datas da URL
+        url = self.selenium_utils.driver.current_url
+        if not DATE_RANGE_PATTERN.search(url): return False
+
+        return self.open_search_url(DATE_RANGE_PATTERN.sub("dr-{:%Y%m%d}-{:%Y%m%d}".format(checkin, checkout), url))
+
+    @traced()
+    def open_home(self):
+        self.selenium_utils.get(self.base_url)
+
     def get_name(self):
         return self.__class__.__name__
@@ -0,0 +1,46 @@
+from collections import OrderedDict
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+class SurrogateKeyCache:
+    # Chave natural -> chave substituta de uma dimensão, limitada a max_size
+    # entradas (LRU). Chaves conhecidas nunca vão ao banco.
+    def __init__(self, max_size=100_000):
+        self.max_size = max_size
+        self.keys     = OrderedDict()
+        self.hits     = 0
+        self.misses   = 0
+
+    def get(self, key):
+        surrogate_key = self.keys.get(key)
+        if surrogate_key is None:
+            self.misses += 1
+            return None
+
+        self.keys.move_to_end(key)
+        self.hits += 1
+
+        return surrogate_key
+
+    def put(self, key, surrogate_key):
+        self.keys[key] = surrogate_key
+        self.keys.move_to_end(key)
+
+        if len(self.keys) > self.max_size: self.keys.popitem(last=False)
+
+    def discard(self, key):
+        self.keys.pop(key, None)
+
+    def clear(self):
+        self.keys.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size"    : len(self.keys),
+            "hits"    : self.hits,
+            "misses"  : self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
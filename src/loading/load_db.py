@@ -1,15 +1,59 @@
 import pandas as pd
 import psycopg2
 import json
+import io
+import glob
 from datetime import datetime
 from src.utils.logger import logger
+from src.utils.tracing import (tracer, traced)
+from src.utils.helpers import parse_raw_filename
+from src.transformation.cleaning import clean_prices_and_ratings
+from src.transformation.transformations import add_room_attributes
+from src.transformation.locations import LocationResolver
+from src.transformation.entity_resolution import HotelResolver
+from src.transformation.currency import (FX_RATES_FILE, load_fx_rates, normalize_prices)
+from src.collection.raw_store import RawStore
+from src.loading.migrations import (LATEST_VERSION, apply_migrations, schema_version)
+from src.loading.key_cache import SurrogateKeyCache
+from src.loading.snapshot_index import (SnapshotIndex, SNAPSHOT_INDEX_FILE, content_hash, normalize_text)
+
+# Atributos do quarto (src.transformation.transformations) -> colunas do fato
+ROOM_COLUMNS = {
+    'room_name': 'quarto',
+    'bed_config': 'camas',
+    'breakfast_included': 'cafe_incluso',
+    'free_cancellation': 'cancelamento_gratis',
+    'pay_at_property': 'pagamento_no_local',
+    'rooms_left': 'quartos_restantes',
+    'area_m2': 'area_m2',
+}
+
+def to_python(value):
+    """Valor do pandas/numpy como tipo Python aceito pelo psycopg2 (NA vira None)"""
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
 
 class DatabaseLoader:
-    def __init__(self, config_file="configs/db_config.json"):
+    def __init__(self, config_file="configs/db_config.json", snapshot_file=SNAPSHOT_INDEX_FILE, key_cache_size=100_000):
         with open(config_file, 'r') as f:
             self.config = json.load(f)
         self.connection = None
+
+        # snapshot_file=None desliga a detecção de mudanças e carrega tudo
+        self.snapshots = SnapshotIndex(snapshot_file) if snapshot_file else None
+        self.locations = LocationResolver()
+        self.fx_rates = load_fx_rates()
+        self.hotels = HotelResolver()
+
+        # Cache chave natural -> chave substituta de cada dimensão
+        self.key_caches = {
+            'dim_tempo': SurrogateKeyCache(key_cache_size),
+            'dim_hotel': SurrogateKeyCache(key_cache_size),
+            'dim_localizacao': SurrogateKeyCache(key_cache_size),
+        }
     
+    @traced()
     def connect(self):
         try:
             self.connection = psycopg2.connect(**self.config)
@@ -17,199 +61,441 @@ class DatabaseLoader:
         except Exception as e:
             logger.error(f"Erro ao conectar: {e}")
             raise
+
+    @traced()
+    def preload_keys(self):
+        """Preencher os caches de chaves com uma única consulta às três dimensões"""
+        # Só com o esquema na última versão: antes das migrações as colunas
+        # das chaves (ex.: bairro) podem não existir
+        if schema_version(self.connection) < LATEST_VERSION:
+            logger.info("Esquema desatualizado; caches de chaves não preenchidos")
+            return
+
+        cursor = self.connection.cursor()
+        try:
+            # As chaves mais recentes de cada dimensão, até o tamanho do cache
+            cursor.execute("""
+                (SELECT 'dim_tempo', sk_tempo, ARRAY[dia::text, mes::text, ano::text]
+                 FROM dim_tempo ORDER BY sk_tempo DESC LIMIT %(limit)s)
+                UNION ALL
+                (SELECT 'dim_hotel', sk_hotel, ARRAY[nome]
+                 FROM dim_hotel ORDER BY sk_hotel DESC LIMIT %(limit)s)
+                UNION ALL
+                (SELECT 'dim_localizacao', sk_local, ARRAY[cidade, estado, pais, bairro]
+                 FROM dim_localizacao ORDER BY sk_local DESC LIMIT %(limit)s)
+            """, {'limit': max(cache.max_size for cache in self.key_caches.values())})
+            rows = cursor.fetchall()
+            self.connection.commit()
+        except Exception as e:
+            # Cache vazio não impede a carga: as chaves vêm do banco sob demanda
+            logger.warning(f"Erro ao preencher caches de chaves: {e}")
+            self.connection.rollback()
+            return
+
+        for dimension, surrogate_key, natural_key in reversed(rows):
+            if dimension == 'dim_tempo':
+                natural_key = tuple(int(part) for part in natural_key)
+            self.key_caches[dimension].put(tuple(natural_key), surrogate_key)
+
+        logger.info(f"Caches de chaves preenchidos: { {name: len(cache.keys) for name, cache in self.key_caches.items()} }")
+
+    def get_surrogate_key(self, cursor, dimension, natural_key, query, params, new_keys):
+        """Chave substituta do cache ou, se desconhecida, de um upsert com RETURNING"""
+        cache = self.key_caches[dimension]
+
+        surrogate_key = cache.get(natural_key)
+        if surrogate_key is None:
+            cursor.execute(query, params)
+            surrogate_key = cursor.fetchone()[0]
+            cache.put(natural_key, surrogate_key)
+            new_keys.append((dimension, natural_key))
+
+        return surrogate_key
+
+    def key_cache_stats(self):
+        """Tamanho, acertos e falhas de cada cache de chaves"""
+        return {name: cache.stats() for name, cache in self.key_caches.items()}
     
+    @traced()
     def create_tables(self):
-        """Criar tabelas do Data Warehouse"""
-        cursor = self.connection.cursor()
-        
-        # Dropar tabelas existentes para recriar com constraints
-        cursor.execute("DROP TABLE IF EXISTS fato_hospedagem CASCADE")
-        cursor.execute("DROP TABLE IF EXISTS dim_tempo CASCADE")
-        cursor.execute("DROP TABLE IF EXISTS dim_hotel CASCADE")
-        cursor.execute("DROP TABLE IF EXISTS dim_localizacao CASCADE")
-        
-        # Dim Tempo
-        cursor.execute("""
-            CREATE TABLE dim_tempo (
-                sk_tempo SERIAL PRIMARY KEY,
-                dia INTEGER,
-                mes INTEGER,
-                ano INTEGER,
-                semana INTEGER,
-                semestre INTEGER,
-                UNIQUE(dia, mes, ano)
-            )
-        """)
-        
-        # Dim Hotel
-        cursor.execute("""
-            CREATE TABLE dim_hotel (
-                sk_hotel SERIAL PRIMARY KEY,
-                nome VARCHAR(255) UNIQUE,
-                tipo VARCHAR(100),
-                estrelas INTEGER
-            )
-        """)
-        
-        # Dim Localização
-        cursor.execute("""
-            CREATE TABLE dim_localizacao (
-                sk_local SERIAL PRIMARY KEY,
-                cidade VARCHAR(100),
-                estado VARCHAR(100),
-                pais VARCHAR(100),
-                UNIQUE(cidade, estado, pais)
-            )
-        """)
-        
-        # Fato Hospedagem
-        cursor.execute("""
-            CREATE TABLE fato_hospedagem (
-                sk_tempo INTEGER REFERENCES dim_tempo(sk_tempo),
-                sk_hotel INTEGER REFERENCES dim_hotel(sk_hotel),
-                sk_local INTEGER REFERENCES dim_localizacao(sk_local),
-                preco DECIMAL(10,2),
-                avaliacao DECIMAL(3,2)
-            )
-        """)
-        
-        self.connection.commit()
+        """Criar ou atualizar as tabelas do Data Warehouse (migrações idempotentes, sem DROP)"""
+        apply_migrations(self.connection)
+
+        # Chaves só depois das migrações, com o esquema já na última versão
+        self.preload_keys()
         logger.info("Tabelas criadas com sucesso")
     
-    def load_data(self, csv_file):
-        """Carregar dados do CSV para o DW"""
+    @traced()
+    def load_fx_rates(self, fx_rates_file=FX_RATES_FILE):
+        """Carregar a tabela local de câmbio no DW"""
+        rates = load_fx_rates(fx_rates_file)
+        cursor = self.connection.cursor()
+
+        cursor.executemany("""
+            INSERT INTO taxa_cambio (data, moeda, taxa_usd)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (data, moeda) DO UPDATE SET taxa_usd = EXCLUDED.taxa_usd
+        """, [(row.data.date(), row.moeda, float(row.taxa_usd)) for row in rates.itertuples()])
+
+        self.connection.commit()
+        logger.info(f"{len(rates)} taxas de câmbio carregadas")
+
+    def start_batch(self, csv_file, checksum, rows):
+        """Abrir (ou retomar) o lote de carga do arquivo; None se ele já foi carregado"""
+        cursor = self.connection.cursor()
+
+        try:
+            cursor.execute("SELECT sk_lote, status FROM lote_carga WHERE checksum = %s FOR UPDATE", (checksum,))
+            batch = cursor.fetchone()
+
+            if batch is not None and batch[1] == 'concluido':
+                self.connection.commit()
+                return None
+
+            if batch is not None:
+                # Lote interrompido: os fatos que chegaram a entrar saem e o
+                # arquivo é carregado de novo
+                sk_lote = batch[0]
+                cursor.execute("DELETE FROM fato_hospedagem WHERE sk_lote = %s", (sk_lote,))
+                logger.info(f"Lote {sk_lote} retomado: {cursor.rowcount} fatos anteriores removidos")
+                cursor.execute(
+                    "UPDATE lote_carga SET arquivo = %s, linhas = %s, carregado_em = now() WHERE sk_lote = %s",
+                    (csv_file, rows, sk_lote)
+                )
+            else:
+                cursor.execute(
+                    "INSERT INTO lote_carga (arquivo, checksum, linhas) VALUES (%s, %s, %s) RETURNING sk_lote",
+                    (csv_file, checksum, rows)
+                )
+                sk_lote = cursor.fetchone()[0]
+
+            self.connection.commit()
+
+        except Exception as e:
+            logger.error(f"Erro ao abrir lote de carga: {e}")
+            self.connection.rollback()
+            raise
+
+        return sk_lote
+
+    def finish_batch(self, cursor, sk_lote, fatos):
+        """Marcar o lote como concluído (na transação do cursor recebido)"""
+        cursor.execute(
+            "UPDATE lote_carga SET status = 'concluido', fatos = %s, carregado_em = now() WHERE sk_lote = %s",
+            (fatos, sk_lote)
+        )
+
+    def get_snapshot_keys(self, df, csv_file):
+        """Chaves (site, hotel, estadia) de cada registro para o índice de snapshots"""
+        info = parse_raw_filename(csv_file) or {"site": "booking", "scraped_at": datetime.now()}
+
+        # Arquivos mesclados trazem o site por linha; a estadia (check-in e
+        # noites) vem de cada registro. Arquivos antigos, sem ela, usam o
+        # horário da coleta: só se comparam consigo mesmos, mas duas buscas
+        # do mesmo dia com check-ins diferentes não se confundem.
+        if 'source_site' in df.columns:
+            sites = df['source_site'].str.lower()
+        elif 'site' in df.columns:
+            sites = df['site'].str.lower()
+        else:
+            sites = pd.Series(info["site"], index=df.index)
+        if 'checkin' in df.columns:
+            nights = df['nights'].astype(str) if 'nights' in df.columns else pd.Series("1", index=df.index)
+            checkins = df['checkin'].astype(str) + "/" + nights
+        else:
+            checkins = pd.Series(f"{info['scraped_at']:%Y-%m-%d %H:%M:%S}", index=df.index)
+
+        return list(zip(sites, df['title'].map(normalize_text), checkins))
+
+    @traced()
+    def load_data(self, csv_file, bulk=True):
+        """Carregar dados do CSV para o DW, uma única vez por conteúdo de arquivo"""
         df = pd.read_csv(csv_file)
-        logger.info(f"Carregando {len(df)} registros de {csv_file}")
-        
+
+        # Registro de lotes: arquivos já carregados (mesmo checksum) são
+        # ignorados, então rodar a carga de novo só custa os arquivos novos
+        sk_lote = self.start_batch(csv_file, RawStore.checksum(csv_file), len(df))
+        if sk_lote is None:
+            logger.info(f"{csv_file} já carregado anteriormente, ignorado")
+            return
+
+        logger.info(f"Carregando {len(df)} registros de {csv_file} (lote {sk_lote})")
+
+        df = self.prepare_frame(df, csv_file)
+
+        # Ofertas iguais à última vista para o mesmo hotel e estadia não são
+        # inseridas de novo
+        changed = [True] * len(df)
+        if self.snapshots is not None:
+            keys = self.get_snapshot_keys(df, csv_file)
+            changed = self.snapshots.changed(keys, df['content_hash'].tolist())
+            logger.info(f"{sum(changed)} registros novos ou alterados a inserir")
+
+        # Mesmo hotel com títulos diferentes entre sites: um id canônico
+        df['id_canonico'] = self.hotels.resolve(df, 'title', 'cidade')
+
+        # Carga em lote (COPY + SQL por conjunto): o arquivo inteiro entra ou
+        # nada entra. A carga linha a linha continua disponível com bulk=False.
+        if bulk:
+            self.bulk_insert(df[changed], sk_lote)
+        else:
+            loaded = self.insert_rows(df, changed, sk_lote)
+
+            # Com linhas que falharam o lote fica aberto: a próxima execução
+            # remove os fatos dele e carrega o arquivo de novo
+            if loaded != changed:
+                logger.warning(f"Lote {sk_lote} incompleto: {sum(changed) - sum(loaded)} linhas com erro")
+                return
+
+            cursor = self.connection.cursor()
+            self.finish_batch(cursor, sk_lote, sum(loaded))
+            self.connection.commit()
+
+        # O índice de snapshots só avança com o lote concluído
+        if self.snapshots is not None:
+            self.snapshots.update(keys, df['content_hash'].tolist(), changed)
+    
+    def prepare_frame(self, df, csv_file):
+        """Completar só as colunas que o arquivo não traz (os de data/interim já vêm normalizados)"""
+        info = parse_raw_filename(csv_file)
+
+        # Preço, moeda, nota e avaliações de todas as linhas de uma vez
+        if 'price' not in df.columns:
+            df = clean_prices_and_ratings(df)
+
+        # Atributos do quarto a partir de recommended_units
+        if 'room_name' not in df.columns:
+            df = add_room_attributes(df)
+
+        # Hash de conteúdo por registro, sobre os valores já extraídos
+        if 'content_hash' not in df.columns:
+            df['content_hash'] = content_hash(df)
+
+        # Preço em USD pela taxa da data da coleta
+        if 'price_usd' not in df.columns:
+            df = normalize_prices(df, self.fx_rates, date=info["scraped_at"] if info else None)
+
+        # Localização a partir do endereço e do destino do nome do arquivo
+        if 'cidade' not in df.columns:
+            destination = info["destination"] if info else None
+            df[['cidade', 'estado', 'pais', 'bairro']] = self.locations.resolve_frame(df['address'], destination)
+
+        # O CSV lê '' como NaN; nas chaves das dimensões vazio é ''
+        df[['cidade', 'estado', 'pais', 'bairro']] = df[['cidade', 'estado', 'pais', 'bairro']].fillna('')
+        df['rooms_left'] = df['rooms_left'].astype('Int64')
+
+        return df
+
+    def insert_rows(self, df, changed, sk_lote=None):
+        """Inserir linha a linha, devolvendo quais linhas entraram"""
+        loaded = [False] * len(df)
+
         # Processar cada linha
-        for _, row in df.iterrows():
+        for position, (_, row) in enumerate(df.iterrows()):
+            if not changed[position]:
+                continue
+
             try:
                 # Extrair dados
                 hotel_nome = row['title']
-                endereco = row['address']
-                preco_texto = row['final_price']
-                avaliacao_texto = row['review_score']
-                
-                # Processar preço
-                preco = self.extract_price(preco_texto)
-                
-                # Processar avaliação
-                avaliacao = self.extract_rating(avaliacao_texto)
-                
-                # Processar localização
-                cidade, estado, pais = self.parse_address(endereco)
+                preco = None if pd.isna(row['price']) else float(row['price'])
+                avaliacao = None if pd.isna(row['score']) else float(row['score'])
+                moeda = None if pd.isna(row['currency']) else row['currency']
+                preco_usd = None if pd.isna(row['price_usd']) else float(row['price_usd'])
                 
                 # Inserir dados
-                self.insert_hotel_data(hotel_nome, preco, avaliacao, cidade, estado, pais)
+                self.insert_hotel_data(
+                    hotel_nome, preco, avaliacao, row['cidade'], row['estado'], row['pais'], row['bairro'], moeda, preco_usd,
+                    row['id_canonico'], sk_lote,
+                    {column: to_python(row[name]) for name, column in ROOM_COLUMNS.items()}
+                )
+                loaded[position] = True
                 
             except Exception as e:
                 logger.warning(f"Erro ao processar linha: {e}")
                 continue
-    
-    def extract_price(self, price_text):
-        """Extrair preço numérico do texto"""
-        import re
-        # Remove caracteres não numéricos exceto ponto e vírgula
-        price_clean = re.sub(r'[^\d.,]', '', str(price_text))
-        try:
-            return float(price_clean.replace(',', '.'))
-        except:
-            return 0.0
-    
-    def extract_rating(self, rating_text):
-        """Extrair avaliação numérica do texto"""
-        import re
-        # Procura por números no texto
-        numbers = re.findall(r'\d+\.?\d*', str(rating_text))
+
+        return loaded
+
+    @traced()
+    def bulk_insert(self, df, sk_lote=None):
+        """Inserir um arquivo inteiro via COPY em tabela de staging, com SQL por conjunto"""
+        hoje = datetime.now()
+        staging = pd.DataFrame({
+            'nome': df['title'],
+            'id_canonico': df['id_canonico'],
+            'cidade': df['cidade'],
+            'estado': df['estado'],
+            'pais': df['pais'],
+            'bairro': df['bairro'],
+            'dia': hoje.day,
+            'mes': hoje.month,
+            'ano': hoje.year,
+            'semana': hoje.isocalendar()[1],
+            'semestre': 1 if hoje.month <= 6 else 2,
+            'preco': df['price'],
+            'avaliacao': df['score'],
+            'moeda': df['currency'],
+            'preco_usd': df['price_usd'],
+            **{column: df[name] for name, column in ROOM_COLUMNS.items()},
+        })
+
+        buffer = io.StringIO()
+        staging.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+
+        cursor = self.connection.cursor()
         try:
-            return float(numbers[0]) if numbers else 0.0
-        except:
-            return 0.0
-    
-    def parse_address(self, address):
-        """Extrair cidade, estado, país do endereço"""
-        # Exemplo: "Nakagyo Ward, Kyoto (Kawaramachi)"
-        parts = address.split(',')
-        if len(parts) >= 2:
-            cidade = parts[1].strip().split('(')[0].strip()
-            estado = parts[0].strip()
-            pais = "Japan"  # Baseado no destino Kyoto Japan
-        else:
-            cidade = address
-            estado = ""
-            pais = "Japan"
-        
-        return cidade, estado, pais
-    
-    def insert_hotel_data(self, hotel_nome, preco, avaliacao, cidade, estado, pais):
+            cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS staging_hospedagem (
+                    nome VARCHAR(255),
+                    id_canonico VARCHAR(32),
+                    cidade VARCHAR(100),
+                    estado VARCHAR(100),
+                    pais VARCHAR(100),
+                    bairro VARCHAR(100),
+                    dia INTEGER,
+                    mes INTEGER,
+                    ano INTEGER,
+                    semana INTEGER,
+                    semestre INTEGER,
+                    preco DECIMAL(10,2),
+                    avaliacao DECIMAL(4,2),
+                    moeda VARCHAR(3),
+                    preco_usd DECIMAL(12,2),
+                    quarto VARCHAR(255),
+                    camas VARCHAR(255),
+                    cafe_incluso BOOLEAN,
+                    cancelamento_gratis BOOLEAN,
+                    pagamento_no_local BOOLEAN,
+                    quartos_restantes INTEGER,
+                    area_m2 DECIMAL(8,1)
+                ) ON COMMIT DELETE ROWS
+            """)
+
+            # Campos de texto vazios continuam '' (e não NULL) para casar com
+            # as chaves das dimensões
+            cursor.copy_expert(f"""
+                COPY staging_hospedagem ({', '.join(staging.columns)})
+                FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (nome, cidade, estado, pais, bairro))
+            """, buffer)
+
+            # Dimensões: um upsert por tabela para o arquivo inteiro
+            cursor.execute("""
+                INSERT INTO dim_tempo (dia, mes, ano, semana, semestre)
+                SELECT DISTINCT dia, mes, ano, semana, semestre FROM staging_hospedagem
+                ON CONFLICT (dia, mes, ano) DO NOTHING
+            """)
+            cursor.execute("""
+                INSERT INTO dim_hotel (nome, tipo, estrelas, id_canonico)
+                SELECT DISTINCT ON (nome) nome, 'Hotel', 0, id_canonico FROM staging_hospedagem
+                ORDER BY nome
+                ON CONFLICT (nome) DO UPDATE SET id_canonico = COALESCE(dim_hotel.id_canonico, EXCLUDED.id_canonico)
+            """)
+            cursor.execute("""
+                INSERT INTO dim_localizacao (cidade, estado, pais, bairro)
+                SELECT DISTINCT cidade, estado, pais, bairro FROM staging_hospedagem
+                ON CONFLICT (cidade, estado, pais, bairro) DO NOTHING
+            """)
+
+            # Fatos: um único INSERT ... SELECT com as chaves resolvidas por join
+            cursor.execute("""
+                INSERT INTO fato_hospedagem (
+                    sk_tempo, sk_hotel, sk_local, preco, avaliacao, moeda, preco_usd, sk_lote,
+                    quarto, camas, cafe_incluso, cancelamento_gratis, pagamento_no_local, quartos_restantes, area_m2
+                )
+                SELECT
+                    dt.sk_tempo, dh.sk_hotel, dl.sk_local, s.preco, s.avaliacao, s.moeda, s.preco_usd, %s,
+                    s.quarto, s.camas, s.cafe_incluso, s.cancelamento_gratis, s.pagamento_no_local, s.quartos_restantes, s.area_m2
+                FROM staging_hospedagem s
+                JOIN dim_tempo dt ON (dt.dia, dt.mes, dt.ano) = (s.dia, s.mes, s.ano)
+                JOIN dim_hotel dh ON dh.nome = s.nome
+                JOIN dim_localizacao dl ON (dl.cidade, dl.estado, dl.pais, dl.bairro) = (s.cidade, s.estado, s.pais, s.bairro)
+            """, (sk_lote,))
+            inserted = cursor.rowcount
+
+            # Fatos e conclusão do lote na mesma transação
+            if sk_lote is not None:
+                self.finish_batch(cursor, sk_lote, inserted)
+
+            self.connection.commit()
+            logger.info(f"{inserted} fatos inseridos em lote")
+
+        except Exception as e:
+            logger.error(f"Erro na carga em lote: {e}")
+            self.connection.rollback()
+            raise
+
+        return inserted
+
+    def insert_hotel_data(self, hotel_nome, preco, avaliacao, cidade, estado, pais, bairro="", moeda=None, preco_usd=None, id_canonico=None, sk_lote=None, atributos_quarto=None):
         """Inserir dados do hotel no DW"""
         cursor = self.connection.cursor()
         
+        # Chaves inseridas nesta transação: saem do cache se ela falhar
+        new_keys = []
+
         try:
             # Inserir/obter sk_tempo (data atual)
             hoje = datetime.now()
-            cursor.execute("""
+            sk_tempo = self.get_surrogate_key(cursor, 'dim_tempo', (hoje.day, hoje.month, hoje.year), """
                 INSERT INTO dim_tempo (dia, mes, ano, semana, semestre)
                 VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (dia, mes, ano) DO NOTHING
-            """, (hoje.day, hoje.month, hoje.year, hoje.isocalendar()[1], 1 if hoje.month <= 6 else 2))
-            
-            # Obter sk_tempo
-            cursor.execute("""
-                SELECT sk_tempo FROM dim_tempo 
-                WHERE dia = %s AND mes = %s AND ano = %s
-            """, (hoje.day, hoje.month, hoje.year))
-            sk_tempo = cursor.fetchone()[0]
+                ON CONFLICT (dia, mes, ano) DO UPDATE SET semana = EXCLUDED.semana
+                RETURNING sk_tempo
+            """, (hoje.day, hoje.month, hoje.year, hoje.isocalendar()[1], 1 if hoje.month <= 6 else 2), new_keys)
             
             # Inserir/obter sk_hotel
-            cursor.execute("""
-                INSERT INTO dim_hotel (nome, tipo, estrelas)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (nome) DO NOTHING
-            """, (hotel_nome, "Hotel", 0))
-            
-            # Obter sk_hotel
-            cursor.execute("""
-                SELECT sk_hotel FROM dim_hotel WHERE nome = %s
-            """, (hotel_nome,))
-            sk_hotel = cursor.fetchone()[0]
+            sk_hotel = self.get_surrogate_key(cursor, 'dim_hotel', (hotel_nome,), """
+                INSERT INTO dim_hotel (nome, tipo, estrelas, id_canonico)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (nome) DO UPDATE SET id_canonico = COALESCE(dim_hotel.id_canonico, EXCLUDED.id_canonico)
+                RETURNING sk_hotel
+            """, (hotel_nome, "Hotel", 0, id_canonico), new_keys)
             
             # Inserir/obter sk_local
-            cursor.execute("""
-                INSERT INTO dim_localizacao (cidade, estado, pais)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (cidade, estado, pais) DO NOTHING
-            """, (cidade, estado, pais))
-            
-            # Obter sk_local
-            cursor.execute("""
-                SELECT sk_local FROM dim_localizacao 
-                WHERE cidade = %s AND estado = %s AND pais = %s
-            """, (cidade, estado, pais))
-            sk_local = cursor.fetchone()[0]
+            sk_local = self.get_surrogate_key(cursor, 'dim_localizacao', (cidade, estado, pais, bairro), """
+                INSERT INTO dim_localizacao (cidade, estado, pais, bairro)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (cidade, estado, pais, bairro) DO UPDATE SET cidade = EXCLUDED.cidade
+                RETURNING sk_local
+            """, (cidade, estado, pais, bairro), new_keys)
             
             # Inserir fato
-            cursor.execute("""
-                INSERT INTO fato_hospedagem (sk_tempo, sk_hotel, sk_local, preco, avaliacao)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (sk_tempo, sk_hotel, sk_local, preco, avaliacao))
+            atributos_quarto = atributos_quarto or {}
+            cursor.execute(f"""
+                INSERT INTO fato_hospedagem (sk_tempo, sk_hotel, sk_local, preco, avaliacao, moeda, preco_usd, sk_lote, {', '.join(ROOM_COLUMNS.values())})
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, {', '.join(['%s'] * len(ROOM_COLUMNS))})
+            """, (sk_tempo, sk_hotel, sk_local, preco, avaliacao, moeda, preco_usd, sk_lote,
+                  *[atributos_quarto.get(column) for column in ROOM_COLUMNS.values()]))
             
             self.connection.commit()
             
         except Exception as e:
             logger.error(f"Erro ao inserir dados: {e}")
             self.connection.rollback()
+            for dimension, natural_key in new_keys:
+                self.key_caches[dimension].discard(natural_key)
             raise
     
+    @traced()
     def close(self):
+        logger.info(f"Caches de chaves: {self.key_cache_stats()}")
         if self.connection:
             self.connection.close()
             logger.info("Conexão fechada")
+        if self.snapshots is not None:
+            self.snapshots.close()
+        self.hotels.close()
 
 if __name__ == "__main__":
     loader = DatabaseLoader()
     loader.connect()
     loader.create_tables()
-    loader.load_data("data/interim/Kyoto_Japan_29-09-2025_15-21-09.csv")
+    loader.load_fx_rates()
+    # Arquivos normalizados por src.transformation.runner
+    for csv_file in sorted(glob.glob("data/interim/*.csv")):
+        loader.load_data(csv_file)
     loader.close()
+    tracer.export_metrics()
     print("Dados carregados com sucesso!")
@@ -0,0 +1,195 @@
+from src.utils.logger import logger
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+# Preço em USD também no banco: fatos sem preco_usd (carregados antes do
+# câmbio) são convertidos pela taxa vigente na data do fato. A view expande
+# fh.*, então é recriada sempre que o fato ganha colunas.
+USD_VIEW = """
+    CREATE VIEW vw_hospedagem_usd AS
+    SELECT
+        fh.*,
+        COALESCE(fh.preco_usd, ROUND(fh.preco * tc.taxa_usd, 2)) AS preco_normalizado
+    FROM fato_hospedagem fh
+    JOIN dim_tempo dt ON fh.sk_tempo = dt.sk_tempo
+    LEFT JOIN LATERAL (
+        SELECT taxa_usd FROM taxa_cambio
+        WHERE moeda = fh.moeda AND data <= make_date(dt.ano, dt.mes, dt.dia)
+        ORDER BY data DESC
+        LIMIT 1
+    ) tc ON TRUE
+"""
+
+# Migrações versionadas do Data Warehouse. Cada uma só cria o que falta ou
+# altera colunas no lugar (IF NOT EXISTS / ADD COLUMN IF NOT EXISTS), então
+# também pode ser aplicada a bancos criados antes do controle de versões.
+# Nenhuma apaga tabelas com dados. Novas mudanças entram no fim da lista.
+MIGRATIONS = [
+    (1, "esquema inicial", [
+        """
+        CREATE TABLE IF NOT EXISTS dim_tempo (
+            sk_tempo SERIAL PRIMARY KEY,
+            dia INTEGER,
+            mes INTEGER,
+            ano INTEGER,
+            semana INTEGER,
+            semestre INTEGER,
+            UNIQUE(dia, mes, ano)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS dim_hotel (
+            sk_hotel SERIAL PRIMARY KEY,
+            nome VARCHAR(255) UNIQUE,
+            tipo VARCHAR(100),
+            estrelas INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS dim_localizacao (
+            sk_local SERIAL PRIMARY KEY,
+            cidade VARCHAR(100),
+            estado VARCHAR(100),
+            pais VARCHAR(100),
+            UNIQUE(cidade, estado, pais)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS fato_hospedagem (
+            sk_tempo INTEGER REFERENCES dim_tempo(sk_tempo),
+            sk_hotel INTEGER REFERENCES dim_hotel(sk_hotel),
+            sk_local INTEGER REFERENCES dim_localizacao(sk_local),
+            preco DECIMAL(10,2),
+            avaliacao DECIMAL(3,2)
+        )
+        """,
+    ]),
+    (2, "avaliação até 10,00", [
+        # A view depende da coluna; é recriada na migração 7
+        "DROP VIEW IF EXISTS vw_hospedagem_usd",
+        "ALTER TABLE fato_hospedagem ALTER COLUMN avaliacao TYPE DECIMAL(4,2)",
+    ]),
+    (3, "bairro na dimensão de localização", [
+        "ALTER TABLE dim_localizacao ADD COLUMN IF NOT EXISTS bairro VARCHAR(100) DEFAULT ''",
+        "UPDATE dim_localizacao SET bairro = '' WHERE bairro IS NULL",
+        "ALTER TABLE dim_localizacao DROP CONSTRAINT IF EXISTS dim_localizacao_cidade_estado_pais_key",
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS dim_localizacao_cidade_estado_pais_bairro_key
+        ON dim_localizacao (cidade, estado, pais, bairro)
+        """,
+    ]),
+    (4, "moeda, preço em USD e câmbio", [
+        "ALTER TABLE fato_hospedagem ADD COLUMN IF NOT EXISTS moeda VARCHAR(3)",
+        "ALTER TABLE fato_hospedagem ADD COLUMN IF NOT EXISTS preco_usd DECIMAL(12,2)",
+        """
+        CREATE TABLE IF NOT EXISTS taxa_cambio (
+            data DATE,
+            moeda VARCHAR(3),
+            taxa_usd NUMERIC(18,8),
+            PRIMARY KEY(data, moeda)
+        )
+        """,
+    ]),
+    (5, "id canônico do hotel", [
+        "ALTER TABLE dim_hotel ADD COLUMN IF NOT EXISTS id_canonico VARCHAR(32)",
+    ]),
+    (6, "registro de lotes de carga", [
+        """
+        CREATE TABLE IF NOT EXISTS lote_carga (
+            sk_lote SERIAL PRIMARY KEY,
+            arquivo TEXT NOT NULL,
+            checksum VARCHAR(64) NOT NULL UNIQUE,
+            status VARCHAR(20) NOT NULL DEFAULT 'carregando',
+            linhas INTEGER,
+            fatos INTEGER,
+            carregado_em TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """,
+        "ALTER TABLE fato_hospedagem ADD COLUMN IF NOT EXISTS sk_lote INTEGER REFERENCES lote_carga(sk_lote)",
+        "CREATE INDEX IF NOT EXISTS fato_hospedagem_sk_lote_idx ON fato_hospedagem (sk_lote)",
+    ]),
+    (7, "view de preços em USD", [
+        "DROP VIEW IF EXISTS vw_hospedagem_usd",
+        USD_VIEW,
+    ]),
+    (8, "atributos do quarto", [
+        "ALTER TABLE fato_hospedagem ADD COLUMN IF NOT EXISTS quarto VARCHAR(255)",
+        "ALTER TABLE fato_hospedagem ADD COLUMN IF NOT EXISTS camas VARCHAR(255)",
+        "ALTER TABLE fato_hospedagem ADD COLUMN IF NOT EXISTS cafe_incluso BOOLEAN",
+        "ALTER TABLE fato_hospedagem ADD COLUMN IF NOT EXISTS cancelamento_gratis BOOLEAN",
+        "ALTER TABLE fato_hospedagem ADD COLUMN IF NOT EXISTS pagamento_no_local BOOLEAN",
+        "ALTER TABLE fato_hospedagem ADD COLUMN IF NOT EXISTS quartos_restantes INTEGER",
+        "ALTER TABLE fato_hospedagem ADD COLUMN IF NOT EXISTS area_m2 DECIMAL(8,1)",
+        "DROP VIEW IF EXISTS vw_hospedagem_usd",
+        USD_VIEW,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Chave do advisory lock: duas cargas simultâneas não migram ao mesmo tempo
+MIGRATION_LOCK_ID = 7203
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def schema_version(connection):
+    """Última migração aplicada no banco (0 se nenhuma, inclusive sem controle de versões)"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT to_regclass('schema_migrations')")
+        if cursor.fetchone()[0] is None:
+            version = 0
+        else:
+            cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+            version = cursor.fetchone()[0]
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+
+    return version
+
+def apply_migrations(connection, migrations=MIGRATIONS):
+    cursor = connection.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            descricao TEXT,
+            aplicada_em TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """)
+    connection.commit()
+
+    applied = []
+    for version, description, statements in migrations:
+        # Cada migração em sua própria transação, junto com o registro dela
+        try:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+            cursor.execute("SELECT 1 FROM schema_migrations WHERE version = %s", (version,))
+            if cursor.fetchone() is not None:
+                connection.commit()
+                continue
+
+            for statement in statements:
+                cursor.execute(statement)
+
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, descricao) VALUES (%s, %s)", (version, description)
+            )
+            connection.commit()
+        except Exception as e:
+            connection.rollback()
+            logger.error(f"Erro na migração {version} ({description}): {e}")
+            raise
+
+        logger.info(f"Migração {version} aplicada: {description}")
+        applied.append(version)
+
+    if not applied: logger.info("Esquema já está na versão mais recente")
+
+    return applied
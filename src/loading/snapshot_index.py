@@ -0,0 +1,113 @@
+import os
+import re
+import sqlite3
+import numbers
+import hashlib
+import pandas as pd
+from time import time
+from src.utils.logger import logger
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+SNAPSHOT_INDEX_FILE = "data/state/snapshots.sqlite"
+
+# Valores já extraídos que viram colunas do fato (preço, moeda, nota e
+# atributos do quarto). O texto exibido fica de fora: review_score traz a
+# contagem de avaliações, que muda sem a oferta mudar. Horário de coleta e
+# origem do arquivo também ficam de fora.
+CONTENT_FIELDS = (
+    "price", "currency", "score", "room_name", "bed_config", "breakfast_included",
+    "free_cancellation", "pay_at_property", "rooms_left", "area_m2"
+)
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def normalize_text(value):
+    if value is None or value != value: return ""
+    return WHITESPACE_PATTERN.sub(" ", str(value)).strip().lower()
+
+def normalize_value(value):
+    # 4 e 4.0 (Int64 ou float, conforme o caminho) geram o mesmo texto;
+    # booleanos viram "true"/"false" como o texto relido do CSV
+    if pd.isna(value): return ""
+    if isinstance(value, numbers.Number) and not isinstance(value, bool): return "{:.2f}".format(float(value))
+    return normalize_text(value)
+
+def content_hash(df, fields=CONTENT_FIELDS):
+    columns = [df[field].map(normalize_value) if field in df.columns else [""] * len(df) for field in fields]
+
+    return [
+        hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
+        for values in zip(*columns)
+    ]
+
+
+class SnapshotIndex:
+    # Último hash visto para cada (site, hotel, check-in). Observações iguais à
+    # anterior não viram fato novo: só atualizam last_seen/seen_count aqui.
+    def __init__(self, path=SNAPSHOT_INDEX_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.path       = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                site TEXT NOT NULL,
+                hotel TEXT NOT NULL,
+                checkin TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                seen_count INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (site, hotel, checkin)
+            )
+        """)
+
+    def get_hashes(self, keys):
+        # Consulta via tabela temporária: uma ida ao banco para o arquivo todo
+        self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (site TEXT, hotel TEXT, checkin TEXT)")
+        self.connection.execute("DELETE FROM wanted")
+        self.connection.executemany("INSERT INTO wanted VALUES (?, ?, ?)", keys)
+
+        rows = self.connection.execute("""
+            SELECT s.site, s.hotel, s.checkin, s.content_hash
+            FROM snapshots s JOIN wanted w USING (site, hotel, checkin)
+        """).fetchall()
+
+        return {(site, hotel, checkin): digest for site, hotel, checkin, digest in rows}
+
+    def changed(self, keys, hashes):
+        # Máscara com True para as observações novas ou alteradas
+        known = self.get_hashes(keys)
+        return [known.get(key) != digest for key, digest in zip(keys, hashes)]
+
+    def update(self, keys, hashes, changed):
+        now = time()
+        with self.connection:
+            self.connection.executemany("""
+                INSERT INTO snapshots (site, hotel, checkin, content_hash, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (site, hotel, checkin) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    first_seen = excluded.first_seen,
+                    last_seen = excluded.last_seen,
+                    seen_count = 1
+            """, [key + (digest, now, now) for key, digest, is_changed in zip(keys, hashes, changed) if is_changed])
+
+            # Marcadores "ainda visto": só o horário e o contador mudam
+            self.connection.executemany(
+                "UPDATE snapshots SET last_seen = ?, seen_count = seen_count + 1 WHERE site = ? AND hotel = ? AND checkin = ?",
+                [(now,) + key for key, is_changed in zip(keys, changed) if not is_changed]
+            )
+
+        logger.info("{} observações novas ou alteradas, {} inalteradas.".format(sum(changed), len(changed) - sum(changed)))
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,108 @@
+import re
+import numpy as np
+import pandas as pd
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+CURRENCY_SYMBOLS = {
+    "R$" : "BRL",
+    "US$": "USD",
+    "$"  : "USD",
+    "€"  : "EUR",
+    "£"  : "GBP",
+    "¥"  : "JPY",
+}
+
+# "R$ 1.050", "$1,051", "€ 112", "BRL 203"
+PRICE_PATTERN = re.compile(
+    r"(?P<currency>R\$|US\$|\$|€|£|¥|\b[A-Z]{3}\b)?\s*(?P<amount>\d[\d.,  ]*)"
+)
+
+# Booking: "Com nota 7,9\n7,9\nBom\n4.927 avaliações" ou
+# "Scored 9.2\n9.2\nWonderful\n1,775 reviews"
+REVIEW_PATTERN = re.compile(
+    r"^(?:Com nota|Scored|Nota|Score)?\s*(?P<score>\d{1,2}(?:[.,]\d{1,2})?)\s*\n"
+    r"(?:\d{1,2}(?:[.,]\d{1,2})?\s*\n)?"
+    r"(?:(?P<label>[^\n\d][^\n]*?)\s*\n)?"
+    r"(?:(?P<count>\d[\d.,]*)\s*(?:avaliaç(?:ão|ões)|reviews?|comentários?))?"
+)
+SCORE_PATTERN        = re.compile(r"(?P<score>\d{1,2}(?:[.,]\d{1,2})?)")
+REVIEW_COUNT_PATTERN = re.compile(r"(?P<count>\d[\d.,]*)\s*(?:avaliaç(?:ão|ões)|reviews?|comentários?)")
+
+# Separadores de milhar: "1.050", "1,051", "12.345.678"
+THOUSANDS_PATTERN = re.compile(r"^\d{1,3}(?:[.,]\d{3})+$")
+# Todo separador que não é o último (o último é o decimal)
+INNER_SEPARATOR_PATTERN = re.compile(r"[.,](?=.*[.,])")
+SPACE_PATTERN           = re.compile(r"[\s ]+")
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def parse_unique(series, parser):
+    # Preços e notas se repetem muito: o parser roda só sobre os valores
+    # distintos e o resultado é espalhado de volta para todas as linhas
+    codes, uniques = pd.factorize(series.astype("string"), use_na_sentinel=True)
+    parsed = parser(pd.Series(uniques, dtype="string"))
+
+    result = parsed.reindex(codes).reset_index(drop=True)
+    result.index = series.index
+
+    return result
+
+def parse_number(series):
+    # Números em pt-BR ("1.234,56") ou en ("1,234.56"): grupos de três
+    # dígitos são milhar; fora isso, o último separador é o decimal
+    text = series.astype("string").str.replace(SPACE_PATTERN, "", regex=True)
+
+    thousands = text.str.fullmatch(THOUSANDS_PATTERN).fillna(False)
+    decimal   = text.str.replace(INNER_SEPARATOR_PATTERN, "", regex=True).str.replace(",", ".", regex=False)
+    integer   = text.str.replace(r"[.,]", "", regex=True)
+
+    return pd.to_numeric(pd.Series(np.where(thousands, integer, decimal), index=series.index), errors="coerce")
+
+def parse_integer(series):
+    text = series.astype("string").str.replace(r"[^\d]", "", regex=True).replace("", pd.NA)
+    return pd.to_numeric(text, errors="coerce").astype("Int64")
+
+def parse_price_values(series):
+    parts = series.str.extract(PRICE_PATTERN)
+
+    return pd.DataFrame({
+        "currency": parts["currency"].map(lambda symbol: CURRENCY_SYMBOLS.get(symbol, symbol), na_action="ignore"),
+        "price"   : parse_number(parts["amount"].str.strip()),
+    })
+
+def parse_review_values(series):
+    text  = series.str.strip()
+    parts = text.str.extract(REVIEW_PATTERN)
+
+    # Textos fora do formato de cartão (uma linha só, ordem diferente): nota
+    # e número de avaliações buscados separadamente
+    score = parts["score"].fillna(text.str.extract(SCORE_PATTERN)["score"])
+    count = parts["count"].fillna(text.str.extract(REVIEW_COUNT_PATTERN)["count"])
+
+    return pd.DataFrame({
+        "score"       : pd.to_numeric(score.str.replace(",", ".", regex=False), errors="coerce"),
+        "score_label" : parts["label"],
+        "review_count": parse_integer(count),
+    })
+
+def parse_prices(series):
+    """Moeda (código ISO) e valor numérico de uma coluna de preços"""
+    return parse_unique(series, parse_price_values)
+
+def parse_reviews(series):
+    """Nota, rótulo e número de avaliações de uma coluna review_score"""
+    return parse_unique(series, parse_review_values)
+
+def clean_prices_and_ratings(df, price_column="final_price", review_column="review_score"):
+    """Acrescenta currency, price, score, score_label e review_count ao DataFrame"""
+    df = df.copy()
+
+    df[["currency", "price"]] = parse_prices(df[price_column])
+    df[["score", "score_label", "review_count"]] = parse_reviews(df[review_column])
+
+    return df
@@ -0,0 +1,53 @@
+import pandas as pd
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+FX_RATES_FILE = "configs/fx_rates.csv"
+BASE_CURRENCY = "USD"
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def load_fx_rates(fx_rates_file=FX_RATES_FILE):
+    """Tabela local de câmbio: quanto vale, em USD, uma unidade de cada moeda em cada data"""
+    rates = pd.read_csv(fx_rates_file, parse_dates=["data"])
+    return rates.sort_values("data").reset_index(drop=True)
+
+def lookup_rates(dates, currencies, rates):
+    # Taxa vigente na data (a mais recente até ela); datas anteriores à
+    # primeira cotação de uma moeda usam a cotação mais próxima
+    left = pd.DataFrame({
+        "data" : pd.to_datetime(dates).astype("datetime64[ns]"),
+        "moeda": currencies.astype(object),
+        "linha": range(len(currencies)),
+    }).sort_values("data")
+    rates = rates.assign(data=rates["data"].astype("datetime64[ns]"), moeda=rates["moeda"].astype(object))
+
+    backward = pd.merge_asof(left, rates, on="data", by="moeda", direction="backward")
+    nearest  = pd.merge_asof(left, rates, on="data", by="moeda", direction="nearest")
+
+    taxa = backward["taxa_usd"].fillna(nearest["taxa_usd"])
+    return pd.Series(taxa.to_numpy(), index=backward["linha"].to_numpy()).sort_index().to_numpy()
+
+def normalize_prices(
+        df,
+        rates=None,
+        date=None,
+        date_column=None,
+        price_column="price",
+        currency_column="currency",
+        output_column="price_usd"
+):
+    """Acrescenta a taxa de câmbio e o preço convertido para USD, sem laço por linha"""
+    rates = load_fx_rates() if rates is None else rates
+    df    = df.copy()
+
+    dates = df[date_column] if date_column else pd.Series(pd.Timestamp(date or "today").normalize(), index=df.index)
+
+    df["fx_rate"]     = lookup_rates(dates, df[currency_column], rates)
+    df[output_column] = (df[price_column] * df["fx_rate"]).round(2)
+
+    return df
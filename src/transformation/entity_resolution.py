@@ -0,0 +1,279 @@
+import os
+import zlib
+import sqlite3
+import hashlib
+import numpy as np
+import pandas as pd
+from collections import defaultdict
+from src.utils.logger import logger
+from src.utils.helpers import slugify
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+HOTEL_REGISTRY_FILE = "data/state/hotels.sqlite"
+
+# Palavras que não distinguem um hotel de outro nos títulos do Booking/Trivago
+NAME_STOPWORDS = {
+    "hotel", "hoteis", "pousada", "hostel", "apart", "aparthotel", "flat", "inn", "suites", "resort",
+    "the", "by", "and", "e", "de", "da", "do", "das", "dos", "del", "la", "el", "em", "at"
+}
+
+# Primo de Mersenne de 31 bits: com a, b e x menores que ele, a*x + b cabe
+# em uint64 e o hash é de fato (a*x + b) mod p
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def name_tokens(name, city=""):
+    # Sem acentos, minúsculas, sem palavras genéricas e sem o nome da cidade
+    city_tokens = set(slugify(city).split("-"))
+    return [
+        token for token in slugify(name).split("-")
+        if token and (token not in NAME_STOPWORDS) and (token not in city_tokens)
+    ] or slugify(name).split("-")
+
+def shingles(tokens, size=3):
+    text = " ".join(tokens)
+    if len(text) <= size: return {text}
+
+    return {text[index:index + size] for index in range(len(text) - size + 1)}
+
+def jaccard(left, right):
+    return len(left & right) / len(left | right) if (left or right) else 0.0
+
+def same_words(left, right):
+    # Trigramas parecidos não bastam ("Ingleses Park" x "Ingleses Palace",
+    # "Eurotel" x "Novotel"): as palavras de um lado devem estar todas no
+    # outro, que só pode acrescentar palavras ("Aruanã Eco Praia" x "Aruana Praia")
+    return (left <= right) or (right <= left)
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+
+        return item
+
+    def union(self, left, right):
+        left, right = self.find(left), self.find(right)
+        if left != right: self.parent[max(left, right)] = min(left, right)
+
+
+class HotelResolver:
+    # Resolução de entidades entre sites: o mesmo hotel com títulos um pouco
+    # diferentes no Booking e no Trivago recebe um único id canônico.
+    # Comparar todos os pares é O(n²); aqui os candidatos vêm de um índice de
+    # blocos por cidade (MinHash/LSH sobre trigramas do nome normalizado) e só
+    # pares do mesmo bloco são comparados. Os ids já atribuídos ficam em um
+    # registro local, então continuam os mesmos entre execuções, junto com as
+    # chaves de bloco de cada hotel: uma carga só calcula assinaturas dos
+    # nomes novos e só lê do registro os hotéis que caem nos mesmos blocos.
+    def __init__(
+            self,
+            registry_file=HOTEL_REGISTRY_FILE,
+            threshold=0.6,
+            num_perm=32,
+            bands=16,
+            max_block_size=100,
+            seed=7
+    ):
+        assert num_perm % bands == 0, "num_perm deve ser múltiplo de bands"
+
+        self.threshold      = threshold
+        self.bands          = bands
+        self.rows           = num_perm // bands
+        self.max_block_size = max_block_size
+
+        rng = np.random.default_rng(seed)
+        self.perm_a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.perm_b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+        os.makedirs(os.path.dirname(registry_file) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(registry_file, timeout=30)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS hotels (
+                cidade TEXT NOT NULL,
+                nome_normalizado TEXT NOT NULL,
+                id_canonico TEXT NOT NULL,
+                nome TEXT,
+                PRIMARY KEY (cidade, nome_normalizado)
+            )
+        """)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS hotel_bands (
+                cidade TEXT NOT NULL,
+                band INTEGER NOT NULL,
+                band_key BLOB NOT NULL,
+                nome_normalizado TEXT NOT NULL,
+                PRIMARY KEY (cidade, band, band_key, nome_normalizado)
+            )
+        """)
+        self.index_registry()
+
+    def index_registry(self):
+        # Registros anteriores às chaves de bloco recebem as suas uma única vez
+        rows = self.connection.execute("""
+            SELECT cidade, nome_normalizado FROM hotels h
+            WHERE NOT EXISTS (
+                SELECT 1 FROM hotel_bands b WHERE b.cidade = h.cidade AND b.nome_normalizado = h.nome_normalizado
+            )
+        """).fetchall()
+        if not rows: return
+
+        with self.connection:
+            self.connection.executemany("INSERT OR IGNORE INTO hotel_bands VALUES (?, ?, ?, ?)", [
+                (city, band, key, normalized)
+                for city, normalized in rows
+                for band, key in self.band_keys(self.signature(shingles(normalized.split(" "))))
+            ])
+
+        logger.info("{} hotéis do registro indexados por blocos.".format(len(rows)))
+
+    def signature(self, shingle_set):
+        # MinHash: menor valor de cada permutação (a*x + b) mod p
+        values = np.array(
+            [zlib.crc32(shingle.encode("utf-8")) % MERSENNE_PRIME for shingle in shingle_set], dtype=np.uint64
+        )
+        hashed = (self.perm_a[:, None] * values[None, :] + self.perm_b[:, None]) % np.uint64(MERSENNE_PRIME)
+
+        return hashed.min(axis=1)
+
+    def band_keys(self, signature):
+        # Uma chave de bloco por faixa da assinatura
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def candidate_pairs(self, buckets):
+        # Blocos grandes demais (nomes muito genéricos) são ignorados para
+        # manter o custo quase linear
+        pairs = set()
+        for members in buckets.values():
+            if (len(members) < 2) or (len(members) > self.max_block_size): continue
+            for position, left in enumerate(members):
+                for right in members[position + 1:]:
+                    pairs.add((left, right))
+
+        return pairs
+
+    def load_registry(self, city, normalized_names):
+        # Só os nomes pedidos, em lotes abaixo do limite de parâmetros do SQLite
+        names = list(normalized_names)
+        known = {}
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            known.update(self.connection.execute(
+                "SELECT nome_normalizado, id_canonico FROM hotels WHERE cidade = ? AND nome_normalizado IN ({})".format(
+                    ", ".join("?" * len(chunk))
+                ),
+                [city] + chunk
+            ).fetchall())
+
+        return known
+
+    def load_blocks(self, city, band_keys):
+        # Hotéis registrados que dividem ao menos um bloco com os nomes novos
+        self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS wanted_bands (band INTEGER, band_key BLOB)")
+        self.connection.execute("DELETE FROM wanted_bands")
+        self.connection.executemany("INSERT INTO wanted_bands VALUES (?, ?)", list(band_keys))
+
+        return self.connection.execute("""
+            SELECT b.band, b.band_key, b.nome_normalizado, h.id_canonico
+            FROM hotel_bands b
+            JOIN wanted_bands w ON b.band = w.band AND b.band_key = w.band_key
+            JOIN hotels h ON h.cidade = b.cidade AND h.nome_normalizado = b.nome_normalizado
+            WHERE b.cidade = ?
+        """, (city,)).fetchall()
+
+    def resolve_city(self, city, names):
+        normalized_names = {name: " ".join(name_tokens(name, city)) for name in names}
+        known            = self.load_registry(city, set(normalized_names.values()))
+
+        new_names = {}
+        for name, normalized in normalized_names.items():
+            if normalized not in known: new_names.setdefault(normalized, name)
+
+        if new_names:
+            # Assinaturas só dos nomes novos; do registro vêm as chaves prontas
+            new_keys = {normalized: self.band_keys(self.signature(shingles(normalized.split(" ")))) for normalized in new_names}
+            blocks   = self.load_blocks(city, {key for keys in new_keys.values() for key in keys})
+
+            entries  = list({(normalized, canonical) for _, _, normalized, canonical in blocks})
+            entries += [(normalized, None) for normalized in new_names]
+            position = {normalized: index for index, (normalized, _) in enumerate(entries)}
+
+            buckets = defaultdict(list)
+            for band, key, normalized, _ in blocks:
+                buckets[(band, key)].append(position[normalized])
+            for normalized, keys in new_keys.items():
+                for key in keys:
+                    buckets[key].append(position[normalized])
+
+            shingle_sets = [shingles(normalized.split(" ")) for normalized, _ in entries]
+            words        = [set(normalized.split(" ")) for normalized, _ in entries]
+            union_find   = UnionFind(len(entries))
+            for left, right in sorted(self.candidate_pairs(buckets)):
+                # Dois hotéis já registrados nunca são fundidos depois
+                if (entries[left][1] is not None) and (entries[right][1] is not None): continue
+                if jaccard(shingle_sets[left], shingle_sets[right]) < self.threshold: continue
+
+                # As palavras são comparadas por grupo: um nome genérico
+                # ("Ingleses") não junta dois hotéis diferentes que o contêm
+                left_root, right_root = union_find.find(left), union_find.find(right)
+                if (left_root == right_root) or not same_words(words[left_root], words[right_root]): continue
+
+                union_find.union(left_root, right_root)
+                words[union_find.find(left_root)] = words[left_root] | words[right_root]
+
+            # Id do grupo: o do hotel registrado, se houver; senão um novo,
+            # derivado da cidade e do primeiro nome do grupo
+            clusters = defaultdict(list)
+            for index in range(len(entries)):
+                clusters[union_find.find(index)].append(index)
+
+            new_rows = []
+            for members in clusters.values():
+                canonicals = sorted(entries[index][1] for index in members if entries[index][1] is not None)
+                canonical  = canonicals[0] if canonicals else "H" + hashlib.sha1(
+                    "{}|{}".format(city, entries[members[0]][0]).encode("utf-8")
+                ).hexdigest()[:15]
+
+                for index in members:
+                    normalized = entries[index][0]
+                    if entries[index][1] is None:
+                        known[normalized] = canonical
+                        new_rows.append((city, normalized, canonical, new_names[normalized]))
+
+            with self.connection:
+                self.connection.executemany("INSERT OR IGNORE INTO hotels VALUES (?, ?, ?, ?)", new_rows)
+                self.connection.executemany("INSERT OR IGNORE INTO hotel_bands VALUES (?, ?, ?, ?)", [
+                    (city, band, key, normalized) for normalized, keys in new_keys.items() for band, key in keys
+                ])
+
+        return {name: known[normalized] for name, normalized in normalized_names.items()}
+
+    def resolve(self, df, name_column="title", city_column="cidade"):
+        """Id canônico de cada linha, resolvendo cada cidade separadamente"""
+        cities = df[city_column].fillna("").map(slugify)
+        result = pd.Series(None, index=df.index, dtype=object)
+        total  = 0
+
+        for city, group in df[name_column].fillna("").groupby(cities):
+            names    = list(group.unique())
+            resolved = self.resolve_city(city, names)
+            result.loc[group.index] = group.map(resolved)
+            total += len(names)
+
+        logger.info("{} nomes de hotel resolvidos em {} ids canônicos.".format(total, result.nunique()))
+
+        return result
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,81 @@
+import re
+import pandas as pd
+from functools import lru_cache
+from src.utils.helpers import slugify
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+GAZETTEER_FILE = "configs/gazetteer.csv"
+
+# "Bairro, Cidade (Região)": a última parte é a cidade, a primeira o bairro e
+# o trecho entre parênteses uma região usada quando não há bairro
+AREA_PATTERN = re.compile(r"\s*\((?P<area>[^)]*)\)\s*$")
+
+
+class LocationResolver:
+    # Resolve cidade/estado/país/bairro combinando o endereço do cartão com o
+    # destino do job (nome do arquivo bruto) por meio de um gazetteer local.
+    # Os mesmos endereços se repetem milhares de vezes por carga, então as
+    # respostas ficam em um cache LRU.
+    def __init__(self, gazetteer_file=GAZETTEER_FILE, cache_size=4096):
+        gazetteer = pd.read_csv(gazetteer_file, dtype=str, keep_default_na=False)
+
+        self.places    = {}
+        self.countries = {}
+        for place in gazetteer.to_dict("records"):
+            names = [place["cidade"] or place["pais"]] + [alias for alias in place["aliases"].split("|") if alias]
+            for name in names:
+                target = self.places if place["cidade"] else self.countries
+                target[slugify(name)] = (place["cidade"], place["estado"], place["pais"])
+
+        # Nomes mais longos primeiro: "sao-paulo" antes de "paulo"
+        self.destination_names = sorted(list(self.places) + list(self.countries), key=len, reverse=True)
+
+        self.resolve = lru_cache(maxsize=cache_size)(self.lookup)
+
+    def find_in_destination(self, destination):
+        # Procura o lugar mais específico citado no destino ("Alesund, Norway",
+        # "Foz do Iguaçu Paraná", "Chile")
+        slug = "-{}-".format(slugify(destination))
+        for name in self.destination_names:
+            if "-{}-".format(name) in slug:
+                return self.places.get(name) or self.countries.get(name)
+
+        return None
+
+    def lookup(self, address, destination=None):
+        address = "" if address is None or address != address else str(address).strip()
+
+        area_match = AREA_PATTERN.search(address)
+        area       = area_match.group("area").strip() if area_match else ""
+        parts      = [part.strip() for part in address[:area_match.start() if area_match else None].split(",") if part.strip()]
+
+        cidade = parts[-1] if parts else ""
+        bairro = parts[0] if len(parts) > 1 else area
+
+        place = self.places.get(slugify(cidade))
+        if place is None and destination:
+            from_destination = self.find_in_destination(destination)
+
+            # Endereço que é só o nome de uma localidade fora do gazetteer:
+            # cidade do cartão, país do destino
+            if from_destination is not None and cidade and slugify(cidade) != slugify(from_destination[0]):
+                place = (cidade, "", from_destination[2])
+            elif from_destination is not None:
+                place = from_destination
+
+        if place is None: place = (cidade, "", "")
+
+        return {"cidade": place[0], "estado": place[1], "pais": place[2], "bairro": bairro}
+
+    def resolve_frame(self, addresses, destination=None):
+        """Resolve uma coluna de endereços, consultando cada endereço distinto uma vez"""
+        resolved = {address: self.resolve(address, destination) for address in addresses.dropna().unique()}
+        empty    = self.resolve(None, destination)
+
+        return pd.DataFrame([resolved.get(address, empty) for address in addresses], index=addresses.index)
+
+    def cache_info(self):
+        return self.resolve.cache_info()
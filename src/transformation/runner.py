@@ -0,0 +1,227 @@
+import os
+import sys
+import glob
+import json
+import pandas as pd
+from time import perf_counter
+from functools import partial
+from datetime import datetime
+from multiprocessing import Pool
+from src.utils.logger import logger
+from src.utils.tracing import (tracer, traced)
+from src.utils.helpers import parse_raw_filename
+from src.collection.raw_store import (RawStore, RAW_STORE_DIR)
+from src.loading.snapshot_index import content_hash
+from src.transformation.cleaning import clean_prices_and_ratings
+from src.transformation.transformations import add_room_attributes
+from src.transformation.locations import LocationResolver
+from src.transformation.currency import (load_fx_rates, normalize_prices)
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+RAW_DIR              = "data/raw"
+INTERIM_DIR          = "data/interim"
+TRANSFORM_STATE_FILE = "data/state/transform_state.json"
+
+# Gazetteer e câmbio carregados uma vez por processo worker
+_locations = None
+_fx_rates  = None
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def init_worker():
+    global _locations, _fx_rates
+
+    _locations = LocationResolver()
+    _fx_rates  = load_fx_rates()
+
+def load_state(path=TRANSFORM_STATE_FILE):
+    if not os.path.exists(path): return {"watermark": 0.0, "files": {}}
+
+    with open(path, 'r', encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(state, path=TRANSFORM_STATE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    temp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(temp_path, 'w', encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+def discover_csv_inputs(raw_dir=RAW_DIR):
+    # Os arquivos "Merged" repetem o conteúdo dos arquivos de cada site
+    tasks = []
+    for path in sorted(glob.glob(os.path.join(raw_dir, "*.csv"))):
+        info = parse_raw_filename(path)
+        if (info is None) or (info["site"] == "merged"): continue
+
+        tasks.append({
+            "key"        : path,
+            "path"       : path,
+            "format"     : "csv",
+            "site"       : info["site"],
+            "destination": info["destination"],
+            "scraped_at" : info["scraped_at"].isoformat(),
+            "output_name": os.path.splitext(os.path.basename(path))[0],
+            "sha256"     : None,
+        })
+
+    return tasks
+
+def get_output_name(entry, scraped_at):
+    # Partições convertidas de um CSV usam o nome dele: as duas fontes geram
+    # o mesmo arquivo em data/interim, nunca uma cópia de cada
+    if entry.get("source"): return os.path.splitext(entry["source"])[0]
+
+    part_id = os.path.splitext(os.path.basename(entry["path"]))[0]
+    return "{} {} {:%Y-%m-%d %H:%M:%S} {}".format(entry["site"].capitalize(), entry["destination"], scraped_at, part_id)
+
+def discover_raw_store_inputs(root=RAW_STORE_DIR):
+    # Uma tarefa por partição do manifesto; o checksum já vem dele
+    tasks = []
+    for entry in RawStore(root).manifest():
+        scraped_at = datetime.fromisoformat(entry["scraped_at"])
+
+        tasks.append({
+            "key"        : entry["path"],
+            "path"       : os.path.join(root, entry["path"]),
+            "format"     : "parquet",
+            "site"       : entry["site"],
+            "destination": entry["destination"],
+            "scraped_at" : entry["scraped_at"],
+            "output_name": get_output_name(entry, scraped_at),
+            "sha256"     : entry["sha256"],
+        })
+
+    return tasks
+
+def select_changed(tasks, state):
+    # Só arquivos novos ou alterados: mtime/tamanho acima da marca d'água ou
+    # diferentes do estado decidem quem precisa de checksum; o checksum
+    # decide quem é reprocessado (um "touch" não refaz nada)
+    changed = []
+    for task in tasks:
+        stat     = os.stat(task["path"])
+        previous = state["files"].get(task["key"])
+
+        task["mtime"] = stat.st_mtime
+        task["size"]  = stat.st_size
+
+        if (previous is not None) and (stat.st_mtime <= state["watermark"]) and (
+            (previous["mtime"], previous["size"]) == (stat.st_mtime, stat.st_size)
+        ):
+            continue
+
+        task["sha256"] = task["sha256"] or RawStore.checksum(task["path"])
+        if (previous is not None) and (previous["sha256"] == task["sha256"]) and os.path.exists(previous["output"]):
+            previous.update(mtime=stat.st_mtime, size=stat.st_size)
+            continue
+
+        changed.append(task)
+
+    return changed
+
+def transform_frame(df, task, locations, fx_rates):
+    scraped_at = datetime.fromisoformat(task["scraped_at"])
+
+    df = clean_prices_and_ratings(df)
+    df = add_room_attributes(df)
+    df = normalize_prices(df, fx_rates, date=scraped_at)
+
+    df[["cidade", "estado", "pais", "bairro"]] = locations.resolve_frame(df["address"], task["destination"])
+
+    df["content_hash"] = content_hash(df)
+    df["site"]         = task["site"]
+    df["destination"]  = task["destination"]
+    df["scraped_at"]   = scraped_at.isoformat(timespec="seconds")
+
+    return df
+
+def transform_file(task, output_dir=INTERIM_DIR):
+    start = perf_counter()
+
+    with tracer.span("transform_file", path=task["path"]):
+        df = pd.read_csv(task["path"]) if task["format"] == "csv" else pd.read_parquet(task["path"])
+        df = transform_frame(df, task, _locations, _fx_rates)
+
+        os.makedirs(output_dir, exist_ok=True)
+        output_file = os.path.join(output_dir, "{}.csv".format(task["output_name"]))
+
+        temp_file = "{}.{}.tmp".format(output_file, os.getpid())
+        df.to_csv(temp_file, index=False)
+        os.replace(temp_file, output_file)
+
+    return dict(task, output=output_file, rows=len(df), elapsed=perf_counter() - start)
+
+@traced()
+def run_transformations(
+        source="csv",
+        raw_dir=RAW_DIR,
+        raw_store_dir=RAW_STORE_DIR,
+        output_dir=INTERIM_DIR,
+        state_file=TRANSFORM_STATE_FILE,
+        workers=None
+):
+    # Os CSVs e o raw store guardam os mesmos registros: uma execução lê uma
+    # das duas fontes
+    tasks = discover_csv_inputs(raw_dir) if source == "csv" else discover_raw_store_inputs(raw_store_dir)
+    state = load_state(state_file)
+
+    changed = select_changed(tasks, state)
+    logger.info("{} de {} entradas novas ou alteradas para transformar.".format(len(changed), len(tasks)))
+
+    outputs = []
+    if not changed:
+        save_state(state, state_file)
+        return outputs
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(changed)))
+    start   = perf_counter()
+
+    pool = Pool(processes=workers, initializer=init_worker)
+    try:
+        for result in pool.imap_unordered(partial(transform_file, output_dir=output_dir), changed):
+            state["files"][result["key"]] = {
+                "sha256"        : result["sha256"],
+                "mtime"         : result["mtime"],
+                "size"          : result["size"],
+                "output"        : result["output"],
+                "rows"          : result["rows"],
+                "transformed_at": datetime.now().isoformat(timespec="seconds")
+            }
+            state["watermark"] = max(state["watermark"], result["mtime"])
+
+            # Estado salvo a cada arquivo: uma falha no meio não refaz o que
+            # já terminou
+            save_state(state, state_file)
+            outputs.append(result["output"])
+
+            logger.info("{} registros de {} transformados em {:.2f}s.".format(result["rows"], result["path"], result["elapsed"]))
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    logger.info("{} arquivos transformados em {:.1f}s com {} workers.".format(len(outputs), perf_counter() - start, workers))
+
+    return outputs
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+if __name__ == "__main__":
+    logger.name = "transformation_runner.py"
+
+    source  = sys.argv[1] if len(sys.argv) > 1 else "csv"
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    run_transformations(source=source, workers=workers)
+    tracer.export_metrics()
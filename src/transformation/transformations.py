@@ -0,0 +1,63 @@
+import re
+import pandas as pd
+from src.transformation.cleaning import (parse_unique, parse_integer, parse_number)
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+SQUARE_FEET_TO_M2 = 0.09290304
+
+# Tabela de padrões do recommended_units (pt-BR e en). A primeira linha do
+# texto é sempre o nome do quarto; as demais vêm em qualquer ordem, por
+# exemplo "Quarto Duplo Standard\n1 cama de casal\nCafé da manhã incluído\n
+# Restam 4 quartos por esse preço no nosso site" ou "Standard Apartment\n
+# Entire apartment • 1 bedroom • 1 bathroom • 215 ft²".
+UNIT_PATTERNS = {
+    "room_name": re.compile(r"^\s*(?P<room_name>[^\n]+?)\s*(?:\n|$)"),
+    "bed_config": re.compile(
+        r"\n(?P<bed_config>"
+        r"\d+ (?:camas?|beds?|twins?|queen|king|full|futons?|bunk)\b[^\n•]*"
+        r"|(?:Camas|Beds): [^\n•]*"
+        r"|Diversos tipos de cama|Multiple bed types"
+        r")"
+    ),
+    "breakfast_included": re.compile(r"caf[ée] da manh[ãa][^\n]*inclu[íi]d|breakfast[^\n]*included", re.IGNORECASE),
+    "free_cancellation" : re.compile(r"cancelamento gr[áa]tis|free cancellation", re.IGNORECASE),
+    "pay_at_property"   : re.compile(
+        r"pague na acomoda[çc][ãa]o|n[ãa]o requer pr[ée]-pagamento|pay at the property|no prepayment", re.IGNORECASE
+    ),
+    "rooms_left": re.compile(r"(?:Restam?|Only) (?P<rooms_left>\d+)\b"),
+    "area"      : re.compile(r"(?P<area>\d+(?:[.,]\d+)?)\s?(?P<unit>m²|ft²)"),
+}
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def parse_unit_values(series):
+    text = series.str.strip()
+    area = text.str.extract(UNIT_PATTERNS["area"])
+
+    area_m2 = parse_number(area["area"])
+    area_m2 = area_m2.where(area["unit"] != "ft²", area_m2 * SQUARE_FEET_TO_M2).round(1)
+
+    return pd.DataFrame({
+        "room_name"         : text.str.extract(UNIT_PATTERNS["room_name"])["room_name"],
+        "bed_config"        : text.str.extract(UNIT_PATTERNS["bed_config"])["bed_config"].str.strip(),
+        "breakfast_included": text.str.contains(UNIT_PATTERNS["breakfast_included"]).fillna(False).astype(bool),
+        "free_cancellation" : text.str.contains(UNIT_PATTERNS["free_cancellation"]).fillna(False).astype(bool),
+        "pay_at_property"   : text.str.contains(UNIT_PATTERNS["pay_at_property"]).fillna(False).astype(bool),
+        "rooms_left"        : parse_integer(text.str.extract(UNIT_PATTERNS["rooms_left"])["rooms_left"]),
+        "area_m2"           : area_m2,
+    })
+
+def parse_recommended_units(series):
+    """Atributos tipados do quarto a partir do texto de recommended_units"""
+    return parse_unique(series, parse_unit_values)
+
+def add_room_attributes(df, column="recommended_units"):
+    """Acrescenta as colunas de atributos do quarto ao DataFrame"""
+    attributes = parse_recommended_units(df[column])
+
+    return pd.concat([df, attributes], axis=1)
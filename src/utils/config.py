@@ -0,0 +1,21 @@
+import os
+import yaml
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+CONFIG_FILE = "configs/config.yaml"
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def load_config(config_file=CONFIG_FILE):
+    if not os.path.exists(config_file): return {}
+
+    with open(config_file, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+def get_section(name, config_file=CONFIG_FILE):
+    return load_config(config_file).get(name) or {}
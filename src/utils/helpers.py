@@ -0,0 +1,39 @@
+import os
+import re
+import unicodedata
+from datetime import datetime
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+# Nomes de arquivo do scraper: "[Site ]Destino data hora[ sufixo].csv", com a
+# data em "AAAA-MM-DD" (arquivos antigos) ou "DD-MM-AAAA"
+RAW_FILENAME_PATTERN = re.compile(
+    r"^(?:(?P<site>Booking|Trivago|Merged) )?(?P<destination>.+?) "
+    r"(?P<date>\d{4}-\d{2}-\d{2}|\d{2}-\d{2}-\d{4}) (?P<time>\d{2}:\d{2}:\d{2})(?: (?P<suffix>.+))?$"
+)
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def slugify(text):
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+def parse_raw_filename(path):
+    name  = os.path.splitext(os.path.basename(path))[0]
+    match = RAW_FILENAME_PATTERN.match(name)
+    if match is None: return None
+
+    date_format = "%Y-%m-%d" if match.group("date")[4] == "-" else "%d-%m-%Y"
+    scraped_at  = datetime.strptime("{} {}".format(match.group("date"), match.group("time")), date_format + " %H:%M:%S")
+
+    return {
+        # Os arquivos sem prefixo são anteriores ao Trivago e vieram do Booking
+        "site"       : (match.group("site") or "Booking").lower(),
+        "destination": match.group("destination"),
+        "scraped_at" : scraped_at,
+        "suffix"     : match.group("suffix")
+    }
@@ -1,4 +1,3 @@
-
 import logging
 import os
 from logging.handlers import RotatingFileHandler
@@ -24,3 +23,29 @@ logger.addHandler(file_handler)
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
 logger.addHandler(console_handler)
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def configure_worker_logger(worker_name):
+    # Cada processo worker escreve no seu próprio arquivo, pois o
+    # RotatingFileHandler não é seguro entre processos ao rotacionar.
+    global file_handler
+
+    worker_formatter = logging.Formatter(
+        "%(asctime)s - {} - %(name)s - %(levelname)s - %(message)s".format(worker_name)
+    )
+
+    logger.removeHandler(file_handler)
+    file_handler.close()
+
+    file_handler = RotatingFileHandler(
+        os.path.join(LOG_DIR, "{}.log".format(worker_name)), maxBytes=5*1024*1024, backupCount=5
+    )
+    file_handler.setFormatter(worker_formatter)
+    logger.addHandler(file_handler)
+
+    console_handler.setFormatter(worker_formatter)
+
+    return logger
@@ -0,0 +1,70 @@
+from time import (sleep, monotonic)
+from random import uniform
+from contextlib import contextmanager
+from src.utils.logger import logger
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+# "scale" multiplica todas as pausas deliberadas; "type_per_char" define se o
+# texto é digitado caractere a caractere (com pausa entre eles) ou de uma vez.
+PACING_PROFILES = {
+    "human" : {"scale": 1.0, "type_per_char": True},
+    "fast"  : {"scale": 0.2, "type_per_char": True},
+    "replay": {"scale": 0.0, "type_per_char": False},
+}
+
+
+class Pacing:
+    def __init__(self, profile="human", profiles=None):
+        profiles = dict(PACING_PROFILES, **(profiles or {}))
+        assert profile in profiles, 'O perfil de ritmo "{}" não existe. Opções: {}'.format(profile, ", ".join(profiles))
+
+        self.profile       = profile
+        self.scale         = float(profiles[profile].get("scale", 1.0))
+        self.type_per_char = bool(profiles[profile].get("type_per_char", True))
+
+        self.reset()
+
+    def reset(self):
+        self.started_at = monotonic()
+        self.sleeping   = 0.0
+        self.waiting    = 0.0
+
+    def pause(self, low, high=None):
+        seconds = (uniform(low, high) if high is not None else low) * self.scale
+        if seconds <= 0: return
+
+        start = monotonic()
+        sleep(seconds)
+        self.sleeping += monotonic() - start
+
+    @contextmanager
+    def waiting_on_page(self):
+        start = monotonic()
+        try:
+            yield
+        finally:
+            self.waiting += monotonic() - start
+
+    def report(self):
+        total = monotonic() - self.started_at
+
+        return {
+            "profile" : self.profile,
+            "total"   : total,
+            "sleeping": self.sleeping,
+            "waiting" : self.waiting,
+            "working" : max(0.0, total - self.sleeping - self.waiting)
+        }
+
+    def log_report(self):
+        report = self.report()
+
+        logger.info(
+            'Tempo total {total:.1f}s (ritmo "{profile}"): {sleeping:.1f}s em pausas, '
+            '{waiting:.1f}s aguardando a página, {working:.1f}s em trabalho.'.format(**report)
+        )
+
+        return report
@@ -1,30 +1,200 @@
 
-from time import sleep
+from time import monotonic
+import os
+import json
 from selenium import webdriver
 from src.utils.logger import logger
-from random import (randint, uniform)
+from src.utils.config import get_section
+from src.utils.pacing import Pacing
+from random import (randint, random)
 from selenium.webdriver.support.wait import WebDriverWait
-from selenium.common import MoveTargetOutOfBoundsException
+from selenium.webdriver.common.by import By
+from selenium.common import (
+    MoveTargetOutOfBoundsException,
+    JavascriptException,
+    StaleElementReferenceException,
+    TimeoutException
+)
 from selenium.webdriver.common.action_chains import ActionChains
 
+# Memória residente do chromedriver e do Chrome; sem psutil, a reciclagem por
+# memória usa o heap JS da página atual
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 
 # Init ---------------------------------------------------------------------- #
 
 
+SESSION_STATE_FILE = "hostwatch_state.json"
+
+FONT_URL_PATTERNS  = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"]
+MEDIA_URL_PATTERNS = ["*.mp4", "*.webm", "*.m3u8", "*.mp3", "*.ogg", "*.wav"]
+
+# Espera no próprio navegador, via MutationObserver, até que algum dos
+# seletores tenha um elemento visível; devolve [índice do seletor, elemento]
+# assim que o DOM muda, ou null ao fim do prazo (em ms).
+WAIT_FOR_ANY_SCRIPT = """
+var selectors = arguments[0];
+var timeout   = arguments[1];
+var done      = arguments[arguments.length - 1];
+
+function visible(node) {
+    return !!(node.offsetWidth || node.offsetHeight || node.getClientRects().length);
+}
+
+function find() {
+    for (var i = 0; i < selectors.length; i++) {
+        var nodes = document.querySelectorAll(selectors[i]);
+        for (var j = 0; j < nodes.length; j++) {
+            if (visible(nodes[j])) return [i, nodes[j]];
+        }
+    }
+    return null;
+}
+
+var found = find();
+if (found !== null) { done(found); return; }
+
+var timer    = null;
+var observer = new MutationObserver(function () {
+    var found = find();
+    if (found === null) return;
+
+    observer.disconnect();
+    clearTimeout(timer);
+    done(found);
+});
+
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+timer = setTimeout(function () { observer.disconnect(); done(null); }, timeout);
+"""
+
+# Lê os campos de vários cards em uma única ida ao navegador. Recebe os cards
+# (lista de WebElements ou um seletor CSS) e um mapa {campo: seletor}; campos
+# com seletor null são devolvidos como null, campos não encontrados são
+# listados em "_missing" junto ao texto do card, para o log de erro.
+# Com "only_new", cards já lidos (marcados com data-hostwatch-seen) são
+# ignorados e apenas cards completos são marcados, para que cards ainda em
+# carregamento sejam lidos de novo na próxima rolagem.
+EXTRACT_RECORDS_SCRIPT = """
+var cards    = arguments[0];
+var fields   = arguments[1];
+var only_new = arguments[2];
+
+if (typeof cards === "string") cards = document.querySelectorAll(cards);
+
+var results = [];
+Array.prototype.forEach.call(cards, function (card) {
+    if (only_new && card.hasAttribute("data-hostwatch-seen")) return;
+
+    var record  = {};
+    var missing = [];
+
+    Object.keys(fields).forEach(function (name) {
+        if (fields[name] === null) { record[name] = null; return; }
+
+        var node = card.querySelector(fields[name]);
+        if (node === null) { missing.push(name); return; }
+
+        record[name] = node.innerText.trim();
+    });
+
+    if (only_new && !missing.length) card.setAttribute("data-hostwatch-seen", "1");
+
+    results.push({record: record, missing: missing, text: missing.length ? card.innerText : null});
+});
+
+return results;
+"""
+
+
+class PacedWait(WebDriverWait):
+    # WebDriverWait que contabiliza o tempo de espera pela página no Pacing
+    def __init__(self, driver, pacing, **kwargs):
+        super().__init__(driver, **kwargs)
+        self.pacing = pacing
+
+    def until(self, method, message=""):
+        with self.pacing.waiting_on_page():
+            return super().until(method, message)
+
+    def until_not(self, method, message=""):
+        with self.pacing.waiting_on_page():
+            return super().until_not(method, message)
+
+
 class Selenium:
-    def __init__(self):
+    def __init__(self, profile=None, pacing=None, user_data_dir=None):
         logger.name = "{}".format(self.get_name())
 
         logger.info("Inicializando {}...".format(self.__class__.__name__))
 
+        self.config  = get_section("selenium")
+        self.profile = profile or self.config.get("profile", "default")
+
+        # Com um diretório de perfil persistente, cookies, idioma e moeda
+        # escolhidos sobrevivem ao fechamento do navegador
+        self.user_data_dir = user_data_dir
+        self.session_state = self.load_session_state()
+        self.jobs_served   = 0
+
+        self.pacing  = Pacing(pacing or self.config.get("pacing", "human"), self.config.get("pacing_profiles"))
         self.driver  = self.setup()
-        self.wait    = WebDriverWait(self.driver, timeout=10)
+        self.wait_config = self.config.get("wait") or {}
+        self.timeout     = self.wait_config.get("timeout", 10)
+        self.poll        = self.wait_config.get("poll_frequency", 0.5)
+
+        self.wait    = PacedWait(self.driver, self.pacing, timeout=self.timeout, poll_frequency=self.poll)
         self.actions = ActionChains(self.driver)
 
         logger.info("{} iniciado.".format(self.get_name()))
 
     def get(self, url):
-        self.driver.get(url)
+        with self.pacing.waiting_on_page():
+            self.driver.get(url)
+
+    def pause(self, low, high=None):
+        self.pacing.pause(low, high)
+
+    def find_first_visible(self, selectors):
+        for index, selector in enumerate(selectors):
+            for element in self.driver.find_elements(By.CSS_SELECTOR, selector):
+                try:
+                    if element.is_displayed(): return index, element
+                except StaleElementReferenceException:
+                    continue
+
+        return False
+
+    def wait_for_any(self, selectors, timeout=None, poll_frequency=None):
+        # Aguarda o primeiro entre vários seletores candidatos e devolve
+        # (índice, elemento). Usa um MutationObserver na página; se a página
+        # navegar durante a espera, continua com polling comum.
+        timeout = self.timeout if timeout is None else timeout
+
+        with self.pacing.waiting_on_page():
+            start = monotonic()
+            try:
+                self.driver.set_script_timeout(timeout + 5)
+                found = self.driver.execute_async_script(WAIT_FOR_ANY_SCRIPT, list(selectors), int(timeout * 1000))
+            except JavascriptException:
+                found = None
+                remaining = timeout - (monotonic() - start)
+
+                if remaining > 0:
+                    wait = WebDriverWait(self.driver, timeout=remaining, poll_frequency=poll_frequency or self.poll)
+                    try:
+                        found = wait.until(lambda driver: self.find_first_visible(selectors))
+                    except TimeoutException:
+                        found = None
+
+        if not found:
+            raise TimeoutException("Nenhum dos seletores apareceu em {}s: {}".format(timeout, ", ".join(selectors)))
+
+        return found[0], found[1]
 
     def click(self, element):
         try:
@@ -37,38 +207,245 @@ class Selenium:
         except MoveTargetOutOfBoundsException:
             self.actions.move_to_element(element).perform()
         finally:
-            sleep(uniform(0.25, 1.5))
+            self.pause(0.25, 1.5)
 
             self.actions.click(element).perform()
 
     def type(self, text_to_type):
-        sleep(uniform(0.5, 2))
+        self.pause(0.5, 2)
+
+        if not self.pacing.type_per_char:
+            self.actions.send_keys(text_to_type).perform()
+            return
 
         for char in text_to_type:
 
-            sleep(uniform(0.1, 0.5))
+            self.pause(0.1, 0.5)
 
             self.actions.send_keys(char).perform()
 
     def scroll_down(self):
         amount_to_scroll = randint(300, 600)
 
-        sleep(uniform(0.6, 2))
+        self.pause(0.6, 2)
 
         self.driver.execute_script(f"window.scrollBy(0, {amount_to_scroll});")
 
     def scroll_up(self):
         amount_to_scroll = randint(300, 600)
 
-        sleep(uniform(0.6, 2))
+        self.pause(0.6, 2)
 
         self.driver.execute_script(f"window.scrollBy(0, -{amount_to_scroll});")
 
+    def extract_records(self, elements, fields, only_new=False, log_missing=True):
+        records = []
+        for result in self.driver.execute_script(EXTRACT_RECORDS_SCRIPT, elements, fields, only_new):
+            if result["missing"]:
+                if log_missing: logger.warning(f"Erro ao obter informações do elemento: '''{result['text']}'''")
+                continue
+
+            records.append(result["record"])
+
+        return records
+
+    def iter_records_while_scrolling(
+            self,
+            card_selector,
+            fields,
+            max_records=None,
+            max_seconds=None,
+            max_stale_steps=3,
+            max_steps=200
+    ):
+        start_time  = monotonic()
+        seen        = set()
+        stale_steps = 0
+        last_height = self.driver.execute_script("return document.body.scrollHeight")
+
+        for step in range(max_steps):
+            # Cards incompletos continuam sem marca e são relidos no próximo passo
+            for record in self.extract_records(card_selector, fields, only_new=True, log_missing=False):
+                key = tuple(record.values())
+                if key in seen: continue
+
+                seen.add(key)
+                yield record
+
+                if (max_records is not None) and (len(seen) >= max_records):
+                    logger.info("Limite de {} registros atingido.".format(max_records))
+                    return
+
+            if (max_seconds is not None) and ((monotonic() - start_time) >= max_seconds):
+                logger.warning("Limite de {}s atingido durante a rolagem.".format(max_seconds))
+                return
+
+            if random() <= 0.20:
+                self.scroll_up()
+                self.pause(0.5, 2)
+
+            self.scroll_down()
+
+            if random() <= 0.20: self.pause(1, 3)
+
+            new_height, total_height = self.driver.execute_script(
+                "return [window.pageYOffset + window.innerHeight, document.body.scrollHeight]"
+            )
+
+            # Ao chegar no fim, a página só "cresce" se carregar mais cards
+            if (new_height >= (total_height * 0.98)) and (total_height <= last_height):
+                stale_steps += 1
+                if stale_steps >= max_stale_steps: break
+            else:
+                stale_steps = 0
+
+            last_height = max(last_height, total_height)
+        else:
+            logger.warning("Limite de {} rolagens atingido antes do fim da página.".format(max_steps))
+
+        for record in self.extract_records(card_selector, fields, only_new=True):
+            key = tuple(record.values())
+            if key in seen: continue
+
+            seen.add(key)
+            yield record
+
+            if (max_records is not None) and (len(seen) >= max_records): return
+
+    def save_page_source(self, path):
+        with open(path, 'w', encoding="utf-8") as f:
+            f.write(self.driver.page_source)
+
+    def get_session_state_file(self):
+        if not self.user_data_dir: return None
+
+        return os.path.join(self.user_data_dir, SESSION_STATE_FILE)
+
+    def load_session_state(self):
+        path = self.get_session_state_file()
+        if (path is None) or (not os.path.exists(path)): return {}
+
+        with open(path, 'r', encoding="utf-8") as f:
+            return json.load(f)
+
+    def get_state(self, key, default=None):
+        return self.session_state.get(key, default)
+
+    def set_state(self, key, value):
+        self.session_state[key] = value
+
+        path = self.get_session_state_file()
+        if path is None: return
+
+        with open(path, 'w', encoding="utf-8") as f:
+            json.dump(self.session_state, f, indent=2)
+
+    def reset(self):
+        # Limpeza barata entre jobs: fecha abas extras e sai da página de
+        # resultados, mantendo cookies e o processo do navegador
+        handles = self.driver.window_handles
+        for handle in handles[1:]:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+
+        self.driver.switch_to.window(handles[0])
+        self.driver.get("about:blank")
+
+        self.actions = ActionChains(self.driver)
+
+    def get_process_memory(self):
+        # Memória residente (RSS), em MB, do chromedriver e de todos os
+        # processos do Chrome abaixo dele: navegador, renderizadores e GPU
+        process = getattr(getattr(self.driver, "service", None), "process", None)
+        if (psutil is None) or (process is None): return None
+
+        try:
+            root      = psutil.Process(process.pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+
+        resident = 0
+        for child in processes:
+            try:
+                resident += child.memory_info().rss
+            except psutil.Error:
+                continue
+
+        return resident / (1024 * 1024)
+
+    def get_memory_usage(self):
+        # Memória do processo do navegador, em MB; sem psutil, o heap JS da
+        # página atual (disponível apenas no Chrome)
+        resident = self.get_process_memory()
+        if resident is not None: return resident
+
+        used_heap = self.driver.execute_script("return window.performance.memory ? performance.memory.usedJSHeapSize : null")
+        if used_heap is None: return None
+
+        return used_heap / (1024 * 1024)
+
+    def should_recycle(self, max_jobs=None, max_memory_mb=None):
+        if (max_jobs is not None) and (self.jobs_served >= max_jobs):
+            logger.info("Driver atendeu {} jobs e será reciclado.".format(self.jobs_served))
+            return True
+
+        memory_usage = self.get_memory_usage() if max_memory_mb is not None else None
+        if (memory_usage is not None) and (memory_usage >= max_memory_mb):
+            logger.info("Driver usando {:.0f}MB de memória e será reciclado.".format(memory_usage))
+            return True
+
+        return False
+
     def get_name(self):
         return self.__class__.__name__
 
+    def get_profile_options(self):
+        profiles = self.config.get("profiles") or {}
+        assert (self.profile == "default") or (self.profile in profiles), 'O perfil "{}" não foi encontrado em configs/config.yaml'.format(self.profile)
+
+        return profiles.get(self.profile) or {}
+
     def setup(self):
-        driver = webdriver.Chrome()
+        profile_options = self.get_profile_options()
+
+        logger.info('Usando o perfil de navegador "{}".'.format(self.profile))
+
+        options = webdriver.ChromeOptions()
+
+        if profile_options.get("headless"):
+            options.add_argument("--headless=new")
+
+        if profile_options.get("window_size"):
+            width, height = profile_options["window_size"]
+            options.add_argument("--window-size={},{}".format(width, height))
+
+        if profile_options.get("page_load_strategy"):
+            options.page_load_strategy = profile_options["page_load_strategy"]
+
+        if profile_options.get("block_images"):
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+        for argument in profile_options.get("arguments") or []:
+            options.add_argument(argument)
+
+        if self.user_data_dir:
+            os.makedirs(self.user_data_dir, exist_ok=True)
+            options.add_argument("--user-data-dir={}".format(os.path.abspath(self.user_data_dir)))
+
+        driver = webdriver.Chrome(options=options)
+
+        blocked_urls = list(profile_options.get("blocked_urls") or [])
+        if profile_options.get("block_fonts"): blocked_urls += FONT_URL_PATTERNS
+        if profile_options.get("block_media"): blocked_urls += MEDIA_URL_PATTERNS
+
+        # Fontes, mídia e scripts de rastreamento não têm preferência própria no
+        # Chrome; são bloqueados na camada de rede via DevTools.
+        if blocked_urls:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_urls})
+
         return driver
 
     def teardown(self):
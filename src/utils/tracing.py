@@ -0,0 +1,158 @@
+import os
+import json
+import threading
+from uuid import uuid4
+from functools import wraps
+from inspect import isgeneratorfunction
+from contextlib import contextmanager
+from time import (time, perf_counter)
+from src.utils.logger import LOG_DIR
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+TRACE_FILE   = os.path.join(LOG_DIR, "traces.jsonl")
+METRICS_FILE = os.path.join(LOG_DIR, "hostwatch.prom")
+
+
+class Tracer:
+    def __init__(self, trace_file=TRACE_FILE, metrics_file=METRICS_FILE, run_id=None):
+        self.trace_file   = trace_file
+        self.metrics_file = metrics_file
+        self.process      = "main"
+        self.local        = threading.local()
+        self.lock         = threading.Lock()
+
+        self.new_run(run_id)
+
+    def new_run(self, run_id=None):
+        # O run_id é herdado por processos filhos (fork ou variável de ambiente),
+        # então os spans dos workers ficam ligados à mesma execução
+        self.run_id = run_id or os.environ.get("HOSTWATCH_RUN_ID") or uuid4().hex
+        os.environ["HOSTWATCH_RUN_ID"] = self.run_id
+
+        self.stats      = {}
+        self.started_at = time()
+
+        return self.run_id
+
+    def set_process(self, process):
+        self.process      = process
+        self.metrics_file = os.path.join(os.path.dirname(METRICS_FILE), "hostwatch_{}.prom".format(process))
+        self.stats        = {}
+
+    def get_stack(self):
+        if not hasattr(self.local, "stack"): self.local.stack = []
+        return self.local.stack
+
+    @contextmanager
+    def span(self, name, **attributes):
+        stack = self.get_stack()
+
+        record = {
+            "run_id"    : self.run_id,
+            "span_id"   : uuid4().hex[:16],
+            "parent_id" : stack[-1] if stack else None,
+            "name"      : name,
+            "process"   : self.process,
+            "start"     : time(),
+            "attributes": attributes
+        }
+
+        stack.append(record["span_id"])
+        start = perf_counter()
+        try:
+            yield record["attributes"]
+            record["status"] = "ok"
+        except BaseException as error:
+            record["status"] = "error"
+            record["error"]  = "{}: {}".format(error.__class__.__name__, error)
+            raise
+        finally:
+            record["duration"] = perf_counter() - start
+            stack.pop()
+            self.record(record)
+
+    def record(self, record):
+        with self.lock:
+            stats = self.stats.setdefault(record["name"], {"count": 0, "sum": 0.0, "max": 0.0, "errors": 0})
+            stats["count"] += 1
+            stats["sum"]   += record["duration"]
+            stats["max"]    = max(stats["max"], record["duration"])
+            if record["status"] == "error": stats["errors"] += 1
+
+            os.makedirs(os.path.dirname(self.trace_file) or ".", exist_ok=True)
+            with open(self.trace_file, 'a', encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def traced(self, name=None):
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            if isgeneratorfunction(func):
+                # O span de um gerador cobre toda a iteração, não só a criação
+                @wraps(func)
+                def generator_wrapper(*args, **kwargs):
+                    with self.span(span_name):
+                        yield from func(*args, **kwargs)
+
+                return generator_wrapper
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def export_metrics(self):
+        # Formato textfile do Prometheus (node_exporter --collector.textfile)
+        labels = 'process="{}"'.format(self.process)
+        lines  = [
+            "# HELP hostwatch_run_info Execução atual do pipeline.",
+            "# TYPE hostwatch_run_info gauge",
+            'hostwatch_run_info{{{},run_id="{}"}} 1'.format(labels, self.run_id),
+            "# HELP hostwatch_run_started_timestamp_seconds Início da execução atual.",
+            "# TYPE hostwatch_run_started_timestamp_seconds gauge",
+            "hostwatch_run_started_timestamp_seconds{{{}}} {:.3f}".format(labels, self.started_at),
+            "# HELP hostwatch_span_duration_seconds Duração dos spans por etapa.",
+            "# TYPE hostwatch_span_duration_seconds summary",
+        ]
+
+        with self.lock:
+            stats = sorted(self.stats.items())
+
+        for span_name, span_stats in stats:
+            span_labels = '{},span="{}"'.format(labels, span_name)
+            lines.append("hostwatch_span_duration_seconds_sum{{{}}} {:.6f}".format(span_labels, span_stats["sum"]))
+            lines.append("hostwatch_span_duration_seconds_count{{{}}} {}".format(span_labels, span_stats["count"]))
+
+        lines += [
+            "# HELP hostwatch_span_duration_max_seconds Maior duração de cada etapa na execução.",
+            "# TYPE hostwatch_span_duration_max_seconds gauge",
+        ]
+        for span_name, span_stats in stats:
+            lines.append('hostwatch_span_duration_max_seconds{{{},span="{}"}} {:.6f}'.format(labels, span_name, span_stats["max"]))
+
+        lines += [
+            "# HELP hostwatch_span_errors_total Spans encerrados com erro.",
+            "# TYPE hostwatch_span_errors_total counter",
+        ]
+        for span_name, span_stats in stats:
+            lines.append('hostwatch_span_errors_total{{{},span="{}"}} {}'.format(labels, span_name, span_stats["errors"]))
+
+        # Escrita atômica: o coletor pode ler o arquivo a qualquer momento
+        os.makedirs(os.path.dirname(self.metrics_file) or ".", exist_ok=True)
+        temp_file = "{}.{}.tmp".format(self.metrics_file, os.getpid())
+        with open(temp_file, 'w', encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_file, self.metrics_file)
+
+        return self.metrics_file
+
+
+tracer = Tracer()
+traced = tracer.traced
@@ -0,0 +1,175 @@
+import os
+import pytest
+import pandas as pd
+from datetime import (date, timedelta)
+from urllib.parse import (urlsplit, parse_qs)
+from src.collection.job_queue import JobQueue
+from src.collection.booking_scrapper import BookingScrapper
+from src.collection.scraping import (plan_date_matrix, search_booking)
+from src.collection.runner import merge_site_outputs
+from src.collection.html_parser import (parse_page_source, parse_saved_page)
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+JOB = {"site": "booking", "location": "Kyoto", "batch": "2025-09-24", "output_dir": "data/raw"}
+
+
+class FakeElement:
+    def find_element(self, *args):
+        return self
+
+
+class FakeWait:
+    def until(self, condition):
+        return FakeElement()
+
+
+class FakeSelenium:
+    wait = FakeWait()
+
+    def pause(self, *args):
+        pass
+
+    def click(self, element):
+        pass
+
+
+@pytest.fixture
+def booking_bot():
+    # BookingScrapper sem navegador: URL e set_dates reais, o resto registrado
+    bot = BookingScrapper.__new__(BookingScrapper)
+    bot.selenium_utils = FakeSelenium()
+    bot.urls           = []
+    bot.open_search_url = lambda url: bot.urls.append(url) or False
+
+    for name in (
+        "open_home", "decline_cookie", "accept_cookie", "select_idiom", "select_coin",
+        "set_destination", "set_occupancy", "search", "set_hotel_filter"
+    ):
+        setattr(bot, name, lambda *args: None)
+
+    return bot
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), max_attempts=2, backoff_seconds=0)
+    yield queue
+    queue.close()
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+def test_job_key_ignores_volatile_fields():
+    assert JobQueue.job_key(JOB) == JobQueue.job_key(dict(JOB, output_dir="outro", queue_path="x"))
+    assert JobQueue.job_key(JOB) != JobQueue.job_key(dict(JOB, batch="2025-09-25"))
+
+def test_enqueue_is_idempotent(job_queue):
+    keys = job_queue.enqueue([JOB, JOB])
+
+    assert keys[0] == keys[1]
+    assert job_queue.counts() == {"pending": 1}
+
+def test_failed_job_is_retried_until_max_attempts(job_queue):
+    [key] = job_queue.enqueue([JOB])
+
+    assert job_queue.claim([key])[0] == key
+    assert job_queue.fail(key, "erro 1") == "pending"
+    assert job_queue.claim([key])[0] == key
+    assert job_queue.fail(key, "erro 2") == "failed"
+    assert job_queue.claim([key]) is None
+
+def test_retry_failed_requeues_failed_jobs(job_queue):
+    [key] = job_queue.enqueue([JOB])
+    for _ in range(2):
+        job_queue.claim([key])
+        job_queue.fail(key, "erro")
+
+    assert job_queue.retry_failed([key]) == 1
+    assert job_queue.get_job(key)["attempts"] == 0
+    assert job_queue.claim([key])[0] == key
+
+def test_recover_requeues_running_jobs(job_queue):
+    [key] = job_queue.enqueue([JOB])
+    job_queue.claim([key])
+
+    assert job_queue.recover() == 1
+    assert job_queue.get_job(key)["state"] == "pending"
+
+def test_checkpoint_keeps_only_the_latest_attempt(job_queue):
+    [key] = job_queue.enqueue([JOB])
+    records = [{"title": "Hotel A"}, {"title": "Hotel B"}]
+
+    job_queue.claim([key])
+    job_queue.checkpoint(key, records)
+    job_queue.fail(key, "erro")
+
+    job_queue.claim([key])
+    job_queue.checkpoint(key, records)
+
+    assert job_queue.get_checkpoint(key) == records
+
+def test_complete_clears_checkpoint(job_queue):
+    [key] = job_queue.enqueue([JOB])
+    job_queue.claim([key])
+    job_queue.checkpoint(key, [{"title": "Hotel A"}])
+    job_queue.complete(key, "saida.csv")
+
+    assert job_queue.get_checkpoint(key) == []
+    assert job_queue.get_job(key)["state"] == "done"
+
+def test_calendar_search_uses_exact_dates(booking_bot):
+    # Mês corrente, exigido pelo datepicker do formulário
+    start = date.today().replace(day=1)
+
+    for checkin, nights in plan_date_matrix(start, start, stays=(1, 2, 5)):
+        search_booking(booking_bot, "Kyoto", checkin, nights, accept_cookie_prob=1)
+
+        # A URL direta "falha" no bot falso, então o formulário (set_dates
+        # real) também é exercitado
+        params = parse_qs(urlsplit(booking_bot.urls[-1]).query)
+        assert "flex_window" not in params
+        assert params["checkout"] == [(checkin + timedelta(days=nights)).isoformat()]
+
+def test_claim_follows_submission_order(job_queue):
+    jobs = [dict(JOB, location=location) for location in ("Kyoto", "Gramado", "Aracaju", "Bonito")]
+    keys = job_queue.enqueue(jobs)
+
+    assert [job_queue.claim()[0] for _ in keys] == keys
+
+def test_merge_uses_job_start_time(tmp_path):
+    output_file = tmp_path / "Booking Kyoto 24-09-2025 10:15:00 worker-1.csv"
+    pd.DataFrame({"title": ["Hotel A"]}).to_csv(output_file, index=False)
+    # Arquivo copiado depois: o mtime não é o horário da coleta
+    os.utime(output_file, (0, 0))
+
+    merged = pd.read_csv(merge_site_outputs("Kyoto", [("booking", str(output_file))], str(tmp_path)))
+
+    assert merged.loc[0, "source_site"] == "booking"
+    assert merged.loc[0, "scraped_at"] == "2025-09-24T10:15:00"
+
+def test_parse_page_source_extracts_booking_cards():
+    with open(os.path.join(FIXTURES_DIR, "booking_kyoto.html"), encoding="utf-8") as f:
+        records = parse_page_source(f.read(), "Booking")
+
+    assert [record["title"] for record in records] == ["Hotel Kanra Kyoto", "Ryokan Yachiyo"]
+    assert records[0] == {
+        "title"            : "Hotel Kanra Kyoto",
+        "address"          : "Shimogyo Ward, Kyoto",
+        "recommended_units": "Quarto Duplo Superior\n1 cama de casal\nCancelamento grátis",
+        "review_score"     : "Com nota 9,1\n9,1\nSoberbo 1.234 avaliações",
+        "final_price"      : "R$ 1.234"
+    }
+    # Comentários e scripts não entram no texto
+    assert records[1]["recommended_units"] == "Quarto Japonês"
+
+def test_parse_page_source_skips_card_without_price(caplog):
+    records = parse_saved_page(os.path.join(FIXTURES_DIR, "booking_kyoto.html"))
+
+    assert "Kyoto Station Inn" not in [record["title"] for record in records]
+    assert "Kyoto Station Inn" in caplog.text
@@ -0,0 +1,139 @@
+import pandas as pd
+import pytest
+from src.transformation.cleaning import (clean_prices_and_ratings, parse_prices, parse_reviews)
+from src.transformation.transformations import parse_recommended_units
+from src.transformation.locations import LocationResolver
+from src.transformation.entity_resolution import HotelResolver
+from src.loading.snapshot_index import content_hash
+
+
+# Init ---------------------------------------------------------------------- #
+
+
+@pytest.fixture(scope="module")
+def resolver():
+    return LocationResolver()
+
+
+# Functions ----------------------------------------------------------------- #
+
+
+@pytest.mark.parametrize("text, currency, price", [
+    ("R$ 1.234", "BRL", 1234),
+    ("$1,051", "USD", 1051),
+    ("US$1,051.50", "USD", 1051.5),
+    ("€ 89", "EUR", 89),
+])
+def test_parse_prices_handles_locales(text, currency, price):
+    parsed = parse_prices(pd.Series([text]))
+
+    assert parsed.loc[0, "currency"] == currency
+    assert parsed.loc[0, "price"] == price
+
+def test_parse_prices_keeps_missing_values():
+    parsed = parse_prices(pd.Series([None, "Preço indisponível"]))
+
+    assert parsed["price"].isna().all()
+
+def test_parse_reviews_pt_br():
+    parsed = parse_reviews(pd.Series(["Com nota 7,9\n7,9\nBom\n1.234 avaliações"]))
+
+    assert parsed.loc[0, "score"] == 7.9
+    assert parsed.loc[0, "score_label"] == "Bom"
+    assert parsed.loc[0, "review_count"] == 1234
+
+def test_parse_reviews_en():
+    parsed = parse_reviews(pd.Series(["Scored 8.6\n8.6\nFabulous\n2,345 reviews"]))
+
+    assert parsed.loc[0, "score"] == 8.6
+    assert parsed.loc[0, "score_label"] == "Fabulous"
+    assert parsed.loc[0, "review_count"] == 2345
+
+def test_clean_prices_and_ratings_adds_columns():
+    df = clean_prices_and_ratings(pd.DataFrame({"final_price": ["R$ 1.234"], "review_score": [None]}))
+
+    assert list(df.columns[-5:]) == ["currency", "price", "score", "score_label", "review_count"]
+    assert pd.isna(df.loc[0, "score"])
+
+def test_content_hash_ignores_review_count():
+    df = clean_prices_and_ratings(pd.DataFrame({
+        "final_price" : ["R$ 1.234", "R$ 1.234", "R$ 1.299"],
+        "review_score": [
+            "Com nota 7,9\n7,9\nBom\n1.234 avaliações",
+            "Com nota 7,9\n7,9\nBom\n1.240 avaliações",
+            "Com nota 7,9\n7,9\nBom\n1.240 avaliações",
+        ]
+    }))
+    hashes = content_hash(df)
+
+    assert hashes[0] == hashes[1]
+    assert hashes[1] != hashes[2]
+
+def test_parse_recommended_units_pt_br():
+    parsed = parse_recommended_units(pd.Series([
+        "Quarto Duplo Standard\n1 cama de casal\nCafé da manhã incluído\nRestam 4 quartos por esse preço no nosso site"
+    ]))
+
+    assert parsed.loc[0, "room_name"] == "Quarto Duplo Standard"
+    assert parsed.loc[0, "bed_config"] == "1 cama de casal"
+    assert parsed.loc[0, "breakfast_included"]
+    assert not parsed.loc[0, "free_cancellation"]
+    assert parsed.loc[0, "rooms_left"] == 4
+
+def test_parse_recommended_units_converts_square_feet():
+    parsed = parse_recommended_units(pd.Series([
+        "Standard Apartment\nEntire apartment • 1 bedroom • 1 bathroom • 215 ft²\nFree cancellation"
+    ]))
+
+    assert parsed.loc[0, "room_name"] == "Standard Apartment"
+    assert parsed.loc[0, "free_cancellation"]
+    assert parsed.loc[0, "area_m2"] == 20.0
+
+def test_location_splits_neighbourhood_and_city(resolver):
+    assert resolver.lookup("Centro, Gramado", "Gramado Rio Grande do Sul") == {
+        "cidade": "Gramado", "estado": "Rio Grande do Sul", "pais": "Brasil", "bairro": "Centro"
+    }
+
+def test_location_ignores_trailing_area(resolver):
+    location = resolver.lookup("Nakagyo Ward, Kyoto (Kawaramachi, Karasuma, Omiya)", "Kyoto Japan")
+
+    assert (location["cidade"], location["pais"], location["bairro"]) == ("Kyoto", "Japão", "Nakagyo Ward")
+
+def test_location_falls_back_to_destination(resolver):
+    assert resolver.lookup(None, "Kyoto Japan")["cidade"] == "Kyoto"
+    assert resolver.lookup("Algum Lugar", "Chile")["pais"] == "Chile"
+
+def test_hotel_resolver_matches_across_runs(tmp_path):
+    registry = str(tmp_path / "hotels.sqlite")
+
+    hotels = HotelResolver(registry)
+    first  = hotels.resolve(pd.DataFrame({"title": ["Hotel Noreg", "Scandic Parken"], "cidade": ["Ålesund"] * 2}))
+    hotels.close()
+
+    hotels = HotelResolver(registry)
+    second = hotels.resolve(pd.DataFrame({"title": ["Noreg Hotel Ålesund"], "cidade": ["Ålesund"]}))
+    hotels.close()
+
+    assert first[0] != first[1]
+    assert second[0] == first[0]
+
+@pytest.mark.parametrize("titles, city", [
+    (["Ingleses Park Hotel", "Ingleses Palace Hotel"], "Florianópolis"),
+    (["Novotel Santiago Providencia", "Hotel Eurotel Providencia"], "Santiago"),
+    (["Ingleses Hotel", "Ingleses Park Hotel", "Ingleses Palace Hotel"], "Florianópolis"),
+])
+def test_hotel_resolver_keeps_similar_names_apart(tmp_path, titles, city):
+    hotels = HotelResolver(str(tmp_path / "hotels.sqlite"))
+    ids    = hotels.resolve(pd.DataFrame({"title": titles, "cidade": [city] * len(titles)}))
+    hotels.close()
+
+    assert ids.nunique() == len(titles)
+
+def test_hotel_resolver_merges_name_with_extra_words(tmp_path):
+    hotels = HotelResolver(str(tmp_path / "hotels.sqlite"))
+    ids    = hotels.resolve(pd.DataFrame({
+        "title": ["Aruanã Eco Praia Hotel", "Pousada Aruana Praia"], "cidade": ["Aracaju"] * 2
+    }))
+    hotels.close()
+
+    assert ids[0] == ids[1]
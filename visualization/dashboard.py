@@ -5,6 +5,7 @@ import psycopg2
 import json
 import numpy as np
 from src.utils.logger import logger
+from src.utils.tracing import (tracer, traced)
 import os
 
 class DataWarehouseAnalyzer:
@@ -13,6 +14,7 @@ class DataWarehouseAnalyzer:
             self.config = json.load(f)
         self.connection = None
     
+    @traced()
     def connect(self):
         """Conectar ao Data Warehouse"""
         try:
@@ -22,6 +24,7 @@ class DataWarehouseAnalyzer:
             logger.error(f"Erro ao conectar: {e}")
             raise
     
+    @traced()
     def get_price_by_city(self):
         """Consultar preço médio por cidade"""
         query = """
@@ -29,11 +32,11 @@ class DataWarehouseAnalyzer:
             dl.cidade,
             dl.pais,
             COUNT(*) as total_hoteis,
-            AVG(fh.preco) as preco_medio,
-            MIN(fh.preco) as preco_minimo,
-            MAX(fh.preco) as preco_maximo,
+            AVG(fh.preco_normalizado) as preco_medio,
+            MIN(fh.preco_normalizado) as preco_minimo,
+            MAX(fh.preco_normalizado) as preco_maximo,
             AVG(fh.avaliacao) as avaliacao_media
-        FROM fato_hospedagem fh
+        FROM vw_hospedagem_usd fh
         JOIN dim_localizacao dl ON fh.sk_local = dl.sk_local
         GROUP BY dl.cidade, dl.pais
         ORDER BY preco_medio DESC
@@ -44,6 +47,7 @@ class DataWarehouseAnalyzer:
         logger.info(f"Cidades encontradas: {df['cidade'].tolist()}")
         return df
     
+    @traced()
     def get_hotels_by_rating(self):
         """Consultar hotéis por faixa de avaliação"""
         query = """
@@ -56,8 +60,8 @@ class DataWarehouseAnalyzer:
                 ELSE 'Ruim (< 6.0)'
             END as faixa_avaliacao,
             COUNT(*) as quantidade_hoteis,
-            AVG(fh.preco) as preco_medio
-        FROM fato_hospedagem fh
+            AVG(fh.preco_normalizado) as preco_medio
+        FROM vw_hospedagem_usd fh
         WHERE fh.avaliacao > 0
         GROUP BY 
             CASE 
@@ -73,24 +77,26 @@ class DataWarehouseAnalyzer:
         df = pd.read_sql(query, self.connection)
         return df
     
+    @traced()
     def get_price_distribution(self):
         """Consultar distribuição de preços"""
         query = """
         SELECT 
-            fh.preco,
+            fh.preco_normalizado as preco,
             fh.avaliacao,
             dl.cidade,
             dl.pais,
             dh.nome as hotel_nome
-        FROM fato_hospedagem fh
+        FROM vw_hospedagem_usd fh
         JOIN dim_localizacao dl ON fh.sk_local = dl.sk_local
         JOIN dim_hotel dh ON fh.sk_hotel = dh.sk_hotel
-        ORDER BY fh.preco
+        ORDER BY fh.preco_normalizado
         """
         
         df = pd.read_sql(query, self.connection)
         return df
     
+    @traced()
     def get_rating_analysis(self):
         """Consultar análise de avaliações por hotel"""
         query = """
@@ -99,9 +105,9 @@ class DataWarehouseAnalyzer:
             dl.cidade,
             dl.pais,
             fh.avaliacao,
-            fh.preco,
+            fh.preco_normalizado as preco,
             COUNT(*) OVER (PARTITION BY dl.cidade) as total_hoteis_cidade
-        FROM fato_hospedagem fh
+        FROM vw_hospedagem_usd fh
         JOIN dim_localizacao dl ON fh.sk_local = dl.sk_local
         JOIN dim_hotel dh ON fh.sk_hotel = dh.sk_hotel
         WHERE fh.avaliacao > 0
@@ -111,6 +117,7 @@ class DataWarehouseAnalyzer:
         df = pd.read_sql(query, self.connection)
         return df
     
+    @traced()
     def get_top_hotels_by_city(self, top_n=5):
         """Consultar top N melhores hotéis por cidade"""
         query = """
@@ -120,9 +127,9 @@ class DataWarehouseAnalyzer:
                 dl.cidade,
                 dl.pais,
                 fh.avaliacao,
-                fh.preco,
-                ROW_NUMBER() OVER (PARTITION BY dl.cidade ORDER BY fh.avaliacao DESC, fh.preco ASC) as ranking
-            FROM fato_hospedagem fh
+                fh.preco_normalizado as preco,
+                ROW_NUMBER() OVER (PARTITION BY dl.cidade ORDER BY fh.avaliacao DESC, fh.preco_normalizado ASC) as ranking
+            FROM vw_hospedagem_usd fh
             JOIN dim_localizacao dl ON fh.sk_local = dl.sk_local
             JOIN dim_hotel dh ON fh.sk_hotel = dh.sk_hotel
             WHERE fh.avaliacao > 0
@@ -142,6 +149,7 @@ class DataWarehouseAnalyzer:
         df = pd.read_sql(query, self.connection, params=[top_n])
         return df
     
+    @traced()
     def create_price_comparison_chart(self, df):
         """Criar gráfico de comparação de preços por cidade"""
         plt.figure(figsize=(14, 8))
@@ -181,6 +189,7 @@ class DataWarehouseAnalyzer:
         plt.tight_layout()
         return plt
     
+    @traced()
     def create_price_distribution_chart(self, df):
         """Criar gráfico de distribuição de preços"""
         plt.figure(figsize=(12, 6))
@@ -201,6 +210,7 @@ class DataWarehouseAnalyzer:
         plt.tight_layout()
         return plt
     
+    @traced()
     def create_rating_analysis_chart(self, df):
         """Criar gráfico de análise por avaliação"""
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
@@ -231,6 +241,7 @@ class DataWarehouseAnalyzer:
         plt.tight_layout()
         return plt
     
+    @traced()
     def create_city_rating_scatter(self, df):
         """Criar gráfico de dispersão: preço vs avaliação por cidade"""
         plt.figure(figsize=(12, 8))
@@ -257,6 +268,7 @@ class DataWarehouseAnalyzer:
         plt.tight_layout()
         return plt
     
+    @traced()
     def create_rating_volume_chart(self, df):
         """Criar gráfico de relação entre número de hotéis e nota média por cidade"""
         plt.figure(figsize=(14, 8))
@@ -307,6 +319,7 @@ class DataWarehouseAnalyzer:
         plt.tight_layout()
         return plt
     
+    @traced()
     def create_top_hotels_chart(self, df):
         """Criar gráfico das melhores hospedagens por cidade"""
         fig, axes = plt.subplots(2, 3, figsize=(20, 12))
@@ -353,6 +366,7 @@ class DataWarehouseAnalyzer:
         plt.tight_layout()
         return plt
     
+    @traced()
     def create_hotel_ranking_table(self, df):
         """Criar tabela de ranking dos melhores hotéis"""
         fig, ax = plt.subplots(figsize=(16, 10))
@@ -400,6 +414,7 @@ class DataWarehouseAnalyzer:
         
         return plt
     
+    @traced()
     def generate_dashboard(self):
         """Gerar dashboard completo"""
         logger.info("Iniciando geração do dashboard...")
@@ -475,6 +490,7 @@ class DataWarehouseAnalyzer:
             print(f"   • {row['cidade']} ({row['pais']}) - {row['total_hoteis']} hotéis - ${row['preco_medio']:.0f} médio")
         print("="*60)
     
+    @traced()
     def close(self):
         """Fechar conexão"""
         if self.connection:
@@ -486,4 +502,5 @@ if __name__ == "__main__":
     analyzer.connect()
     analyzer.generate_dashboard()
     analyzer.close()
+    tracer.export_metrics()
     print("Dashboard gerado com sucesso!")